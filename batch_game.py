@@ -0,0 +1,110 @@
+import numpy as np
+
+from geometry import get_geometry
+
+
+class BatchHexGame:
+    """
+    Steps many games of the same size at once with NumPy.
+
+    Board b is stored as row b of:
+        occupied        (N, segments) bool  - drawn unit segments
+        triangle_owner  (N, triangles) int8 - 0 unclaimed, else the owning player
+        current_player  (N,) int8
+        legal           (N, lines) bool     - lines that can still be drawn
+    Actions are indices into geometry.lines, the same catalog HexGame uses.
+    """
+
+    def __init__(self, num_games, hex_size=3, auto_reset=True):
+        self.num_games = num_games
+        self.hex_size = hex_size
+        self.auto_reset = auto_reset
+        self.geometry = get_geometry(hex_size)
+        self.num_actions = len(self.geometry.lines)
+        self.majority = self.geometry.majority
+
+        # Static tables: segments of each line, and the three edges of each triangle
+        num_segments = len(self.geometry.segments)
+        self.line_segments = np.zeros((self.num_actions, num_segments), dtype=bool)
+        for i, segments in enumerate(self.geometry.line_segment_list):
+            self.line_segments[i, list(segments)] = True
+        self._segment_lines = self.line_segments.T.astype(np.uint8)
+        self.triangle_edges = np.array(
+            [[s for s in range(num_segments) if mask >> s & 1] for mask in self.geometry.triangle_masks],
+            dtype=np.intp)
+
+        self.occupied = np.zeros((num_games, num_segments), dtype=bool)
+        self.triangle_owner = np.zeros((num_games, len(self.geometry.triangles)), dtype=np.int8)
+        self.current_player = np.ones(num_games, dtype=np.int8)
+        self.legal = np.ones((num_games, self.num_actions), dtype=bool)
+        self.game_over = np.zeros(num_games, dtype=bool)
+        self.winner = np.zeros(num_games, dtype=np.int8)  # Only meaningful where game_over
+        self._rows = np.arange(num_games)
+
+    def reset(self, boards=None):
+        """Resets all boards, or only those selected by a bool mask / index array"""
+        if boards is None:
+            boards = slice(None)
+        self.occupied[boards] = False
+        self.triangle_owner[boards] = 0
+        self.current_player[boards] = 1
+        self.legal[boards] = True
+        self.game_over[boards] = False
+        self.winner[boards] = 0
+        return self.legal
+
+    def get_scores(self):
+        """Returns (N, 2) array of triangles owned by player 1 and player 2"""
+        return np.stack([(self.triangle_owner == 1).sum(axis=1), (self.triangle_owner == 2).sum(axis=1)], axis=1)
+
+    def step(self, actions):
+        """
+        Plays actions[b] on board b. Illegal actions, and actions on finished boards
+        when auto_reset is off, leave the board unchanged like HexGame.make_move.
+
+        Returns (rewards, dones, legal, info):
+            rewards  (N,) float32 - +1 if the mover won, 0 otherwise
+            dones    (N,) bool    - the game on this board ended with this action
+            legal    (N, lines) bool legal-action masks, already reset for finished boards
+            info     dict with 'valid', 'winner', 'triangles_formed' and 'scores' arrays
+                     describing the boards before any automatic reset
+        """
+        actions = np.asarray(actions, dtype=np.intp)
+        rows = self._rows
+        valid = self.legal[rows, actions] & ~self.game_over
+        mover = self.current_player.copy()
+
+        # Draw the lines and block every line that crosses a new segment
+        new_segments = self.line_segments[actions] & valid[:, None]
+        self.occupied |= new_segments
+        self.legal &= (new_segments.astype(np.uint8) @ self._segment_lines) == 0
+
+        # Claim triangles whose three edges are now drawn
+        closed = self.occupied[:, self.triangle_edges].all(axis=2)
+        new_triangles = closed & (self.triangle_owner == 0)
+        self.triangle_owner[new_triangles] = np.broadcast_to(mover[:, None], new_triangles.shape)[new_triangles]
+        self.current_player = np.where(valid, 3 - mover, mover).astype(np.int8)
+
+        # Same thresholds as HexGame.make_move
+        scores = self.get_scores()
+        majority_reached = (scores > self.majority).any(axis=1)
+        draw = (scores == self.majority).all(axis=1)
+        dones = valid & (majority_reached | draw)
+        self.game_over |= dones
+        self.winner = np.where(dones, np.where(draw, 0, mover), self.winner).astype(np.int8)
+
+        rewards = (dones & ~draw).astype(np.float32)
+        info = {
+            'valid': valid,
+            'winner': self.winner.copy(),
+            'triangles_formed': new_triangles.sum(axis=1),
+            'scores': scores
+        }
+        if self.auto_reset and dones.any():
+            self.reset(dones)
+        return rewards, dones, self.legal, info
+
+    def sample_legal_actions(self, rng):
+        """Returns one uniformly random legal action per board (boards with none get 0)"""
+        weights = rng.random(self.legal.shape) * self.legal
+        return weights.argmax(axis=1)
@@ -0,0 +1,229 @@
+"""
+Benchmarks for the engine and search hot paths.
+
+Measures HexGame / BitboardHexGame operation latency, random-playout throughput
+and MinimaxAgent search speed on fixed seeded positions for several board sizes.
+Results are saved as JSON and can be compared against a stored baseline:
+
+    python benchmark.py --output bench.json
+    python benchmark.py --baseline bench.json   # exits 1 if anything regressed
+"""
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+
+from bitboard_game import BitboardHexGame
+from game import HexGame
+from instrumentation import SearchStats, instrument_agent
+from mcts_agent import MCTSAgent
+from minimax_agent import MinimaxAgent
+
+ENGINES = {
+    'dict': HexGame,
+    'bitboard': BitboardHexGame
+}
+
+# Fraction of the game's lines drawn before each benchmark position
+POSITION_STAGES = (0.0, 0.3, 0.6)
+
+
+def seeded_positions(engine, hex_size, seed=0):
+    """Returns games at fixed early, middle and late positions"""
+    positions = []
+    for stage in POSITION_STAGES:
+        rng = random.Random(seed)
+        game = engine(hex_size)
+        target = int(stage * len(game.geometry.segments) / 2)
+        while len(game.get_move_history()) < target:
+            moves = sorted(game.get_valid_moves())
+            if game.game_over or not moves:
+                break
+            game.make_move(*rng.choice(moves))
+        positions.append(game)
+    return positions
+
+
+def time_per_call(func, setup=None, repeat=5, number=200):
+    """
+    Best-of-repeat time of one call in microseconds; the minimum is the least
+    disturbed by other load on the machine. When setup is given it runs before
+    each call, outside the timed region, and its result is passed to func.
+    """
+    samples = []
+    for _ in range(repeat):
+        if setup is None:
+            start = time.perf_counter()
+            for _ in range(number):
+                func()
+            samples.append((time.perf_counter() - start) / number)
+        else:
+            total = 0.0
+            for _ in range(number):
+                arg = setup()
+                start = time.perf_counter()
+                func(arg)
+                total += time.perf_counter() - start
+            samples.append(total / number)
+    return min(samples) * 1e6
+
+
+def bench_engine_ops(engine, hex_size, quick):
+    number = 50 if quick else 200
+    results = {}
+    positions = seeded_positions(engine, hex_size)
+    for stage, game in zip(POSITION_STAGES, positions):
+        prefix = f"{stage:.1f}"
+        moves = sorted(game.get_valid_moves()) or [(game.valid_points[0], game.valid_points[1])]
+        probes = [(p1, p2) for p1 in game.valid_points[:6] for p2 in game.valid_points[-6:]]
+        move_iter = iter(range(10 ** 9))
+
+        results[f"get_valid_moves_{prefix}_us"] = time_per_call(game.get_valid_moves, number=number)
+        results[f"iterate_valid_moves_{prefix}_us"] = time_per_call(lambda: list(game.get_valid_moves()),
+                                                                    number=number)
+        results[f"is_valid_connection_{prefix}_us"] = time_per_call(
+            lambda: [game.is_valid_connection(p1, p2) for p1, p2 in probes], number=number) / len(probes)
+        results[f"make_move_{prefix}_us"] = time_per_call(
+            lambda copy: copy.make_move(*moves[next(move_iter) % len(moves)]), setup=game.copy, number=number)
+        results[f"push_pop_move_{prefix}_us"] = time_per_call(
+            lambda: game.push_move(*moves[0]) and game.pop_move(), number=number)
+        results[f"copy_{prefix}_us"] = time_per_call(game.copy, number=number)
+        results[f"get_scores_{prefix}_us"] = time_per_call(game.get_scores, number=number)
+    return results
+
+
+def bench_playouts(engine, hex_size, quick):
+    """Full random games per second through the engine's public API"""
+    rng = random.Random(0)
+    games = 20 if quick else 100
+    start = time.perf_counter()
+    for _ in range(games):
+        game = engine(hex_size)
+        while not game.game_over:
+            game.make_move(*rng.choice(list(game.get_valid_moves())))
+    return {'random_games_per_s': games / (time.perf_counter() - start)}
+
+
+def bench_mcts_playouts(hex_size, quick):
+    """Raw MCTSAgent playouts per second from the empty board"""
+    agent = MCTSAgent(1, seed=0)
+    geometry = BitboardHexGame(hex_size).geometry
+    playouts = 500 if quick else 5000
+    start = time.perf_counter()
+    for _ in range(playouts):
+        agent._simulate(geometry, 0, 0, 0, 1)
+    return {'mcts_playouts_per_s': playouts / (time.perf_counter() - start)}
+
+
+def bench_search(engine, hex_size, depths, quick):
+    """MinimaxAgent nodes per second and time per move, with and without pruning"""
+    results = {}
+    game = seeded_positions(engine, hex_size)[1]
+    for search in ('alphabeta', 'minimax'):
+        for depth in depths:
+            if search == 'minimax' and depth > 2 and (quick or hex_size > 3):
+                continue  # Unpruned depth 3 takes minutes on larger boards
+            # Built as the renderer and tournaments build it, so 'minimax' times the plain fixed-depth search
+            agent = MinimaxAgent(game.current_player, max_depth=depth, search=search, seed=0)
+            elapsed = float('inf')
+            for _ in range(1 if quick else 3):
+                start = time.perf_counter()
+                agent.get_move(game)
+                elapsed = min(elapsed, time.perf_counter() - start)
+            # The fixed-depth path keeps no node count, so count nodes in a separate run
+            stats = SearchStats()
+            remove = instrument_agent(agent, stats)
+            try:
+                agent.get_move(game)
+            finally:
+                remove()
+            results[f"{search}_d{depth}_move_ms"] = elapsed * 1e3
+            results[f"{search}_d{depth}_nodes_per_s"] = sum(stats.nodes.values()) / elapsed
+    return results
+
+
+def run_benchmarks(sizes, engines, depths, quick=False):
+    results = {}
+    for hex_size in sizes:
+        for name in engines:
+            engine = ENGINES[name]
+            sections = (
+                bench_engine_ops(engine, hex_size, quick),
+                bench_playouts(engine, hex_size, quick),
+                bench_search(engine, hex_size, depths, quick)
+            )
+            for section in sections:
+                for metric, value in section.items():
+                    results[f"{name}/{hex_size}/{metric}"] = value
+        for metric, value in bench_mcts_playouts(hex_size, quick).items():
+            results[f"mcts/{hex_size}/{metric}"] = value
+    return results
+
+
+def higher_is_better(metric):
+    return metric.endswith('_per_s')
+
+
+def compare(results, baseline, threshold):
+    """Returns rows (metric, baseline, current, change, regressed) for metrics in both runs"""
+    rows = []
+    for metric, value in results.items():
+        if metric not in baseline:
+            continue
+        old = baseline[metric]
+        change = (value - old) / old if old else 0.0
+        worse = -change if higher_is_better(metric) else change
+        rows.append((metric, old, value, change, worse > threshold))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark engine operations, playouts and search")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[2, 3, 4, 5])
+    parser.add_argument('--engines', nargs='+', default=sorted(ENGINES), choices=sorted(ENGINES))
+    parser.add_argument('--depths', type=int, nargs='+', default=[1, 2, 3])
+    parser.add_argument('--quick', action='store_true', help="Fewer repetitions, for a fast sanity check")
+    parser.add_argument('--output', help="Write results to this JSON file")
+    parser.add_argument('--baseline', help="Compare against results saved by an earlier run")
+    parser.add_argument('--threshold', type=float, default=0.15,
+                        help="Relative slowdown that counts as a regression (default 0.15)")
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.sizes, args.engines, args.depths, quick=args.quick)
+    report = {
+        'meta': {
+            'python': sys.version.split()[0],
+            'platform': platform.platform(),
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'sizes': args.sizes,
+            'engines': args.engines,
+            'depths': args.depths,
+            'quick': args.quick
+        },
+        'results': results
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+
+    if not args.baseline:
+        for metric, value in sorted(results.items()):
+            print(f"{metric:60s} {value:14.2f}")
+        return
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)['results']
+    rows = compare(results, baseline, args.threshold)
+    regressions = 0
+    for metric, old, new, change, regressed in sorted(rows):
+        flag = "  REGRESSION" if regressed else ""
+        print(f"{metric:60s} {old:14.2f} -> {new:14.2f} {change:+8.1%}{flag}")
+        regressions += regressed
+    print(f"{regressions} regression(s) beyond {args.threshold:.0%}")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,261 @@
+from geometry import LANE_MASK, LineSet, get_geometry, iter_bits
+
+
+class BitboardHexGame:
+    """
+    Drop-in alternative to HexGame that keeps state as integer bitmasks.
+
+    Occupied unit segments are one mask and each player's triangles are another,
+    indexed by the shared BoardGeometry catalog for the board size. The dict views
+    HexGame exposes (adjacency_list, line_owners, ...) are only built when asked for.
+
+    Pass a rules.Rules variant as rules to play it instead of the standard game;
+    its bent lines are played as (point1, point2, corner).
+    """
+
+    def __init__(self, hex_size=3, rules=None):
+        if rules is not None:
+            hex_size = rules.hex_size
+        self.hex_size = hex_size
+        self.rules = rules
+        self.geometry = get_geometry(hex_size, rules)
+        self.valid_points = self.geometry.points  # Shared tuple, never copied
+        self.current_player = 1
+        self.occupied = 0  # Bitmask over geometry.segments
+        self.owned = {1: 0, 2: 0}  # Bitmask over geometry.triangles per player
+        self.moves = []  # [(line, player)] in the order they were played
+        self.game_over = False
+        self.winner = None
+        self.legal = self.geometry.all_lines_mask  # Bitmask over geometry.lines still open to play
+        self.started = 0  # Bitmask over geometry.triangles with exactly one edge drawn
+        self.threats = 0  # Bitmask over geometry.triangles with two edges drawn, one segment from completion
+        self.hash_lanes = 0  # Packed Zobrist hashes, see BoardGeometry._build_zobrist_keys
+        self._views = {}
+        self._undo_stack = []
+
+    def get_valid_points(self):
+        """Returns list of all valid (row, col) coordinates on the hex grid"""
+        return list(self.geometry.points)
+
+    def get_valid_moves(self):
+        """
+        Returns the set of all valid moves (point1, point2) that can be made,
+        as an O(1) snapshot view of the legal-line mask.
+        """
+        return LineSet(self.geometry, self.legal)
+
+    def is_valid_connection(self, point1, point2, corner=None):
+        if point1 > point2:
+            point1, point2 = point2, point1
+        line = (point1, point2) if corner is None else (point1, point2, corner)
+        mask = self.geometry.line_masks.get(line)
+        return mask is not None and not mask & self.occupied
+
+    def make_move(self, point1, point2, corner=None):
+        """
+        Attempts to make a move. Returns the same result dict as HexGame.make_move.
+        """
+        if point1 > point2:
+            point1, point2 = point2, point1
+        line = (point1, point2) if corner is None else (point1, point2, corner)
+        mask = self.geometry.line_masks.get(line)
+        if mask is None or mask & self.occupied:
+            return {'valid': False}
+
+        claimed = self._place(line, mask)
+        new_triangles = {self.geometry.triangles[t] for t in iter_bits(claimed)}
+
+        return {
+            'valid': True,
+            'game_over': self.game_over,
+            'triangles_formed': new_triangles,
+            'winner': self.winner,
+            'current_player': self.current_player
+        }
+
+    def push_move(self, point1, point2, corner=None):
+        """
+        Makes a move that can be undone with pop_move.
+        Returns whether the move was valid and applied.
+        """
+        if point1 > point2:
+            point1, point2 = point2, point1
+        line = (point1, point2) if corner is None else (point1, point2, corner)
+        mask = self.geometry.line_masks.get(line)
+        if mask is None or mask & self.occupied:
+            return False
+
+        self._undo_stack.append((self.occupied, self.legal, self.owned[1], self.owned[2], self.started, self.threats,
+                                 self.hash_lanes, self.game_over, self.winner))
+        self._place(line, mask)
+        return True
+
+    def pop_move(self):
+        """Undoes the most recent push_move"""
+        (self.occupied, self.legal, self.owned[1], self.owned[2], self.started, self.threats,
+         self.hash_lanes, self.game_over, self.winner) = self._undo_stack.pop()
+        self.current_player = self.moves.pop()[1]
+        self._views = {}
+
+    def _place(self, line, mask):
+        """Applies an already validated line and returns the mask of triangles it claimed"""
+        geometry = self.geometry
+        occupied = self.occupied | mask
+        claimed = 0
+        blocked = 0
+        started = self.started
+        threats = self.threats
+        hash_lanes = self.hash_lanes ^ geometry.side_key
+        for s in geometry.line_segments[line]:
+            blocked |= geometry.segment_line_masks[s]
+            hash_lanes ^= geometry.segment_keys[s]
+            for bit, triangle_mask in geometry.segment_triangles[s]:
+                drawn = occupied & triangle_mask
+                if drawn == triangle_mask:
+                    claimed |= bit
+                    threats &= ~bit
+                elif drawn & (drawn - 1):  # Two edges
+                    threats |= bit
+                    started &= ~bit
+                else:
+                    started |= bit
+        self.legal &= ~blocked
+        self.started = started & ~claimed
+        self.threats = threats
+
+        player = self.current_player
+        if claimed:
+            triangle_keys = geometry.triangle_keys[player]
+            for t in iter_bits(claimed):
+                hash_lanes ^= triangle_keys[t]
+        self.hash_lanes = hash_lanes
+        self.occupied = occupied
+        self.owned[player] |= claimed
+        self.moves.append((line, player))
+        self.current_player = 3 - player
+        self._views = {}
+
+        majority = geometry.majority
+        if geometry.uniform_weights:
+            score1 = self.owned[1].bit_count()
+            score2 = self.owned[2].bit_count()
+        else:
+            score1 = geometry.score(self.owned[1])
+            score2 = geometry.score(self.owned[2])
+        if score1 > majority or score2 > majority:
+            self.game_over = True
+            self.winner = player
+        if score1 == geometry.draw_score and score2 == geometry.draw_score:
+            self.game_over = True
+            self.winner = 0
+        if not self.legal and not self.game_over:
+            # Out of lines before anyone reached the target: the higher score wins
+            self.game_over = True
+            self.winner = 1 if score1 > score2 else 2 if score2 > score1 else 0
+
+        return claimed
+
+    def get_unique_moves(self):
+        """
+        Returns one valid move per orbit under the symmetries this position keeps,
+        so moves that lead to mirror images of each other are listed once. Each
+        move is a real move in this position and can be played as is.
+        """
+        geometry = self.geometry
+        symmetries = geometry.stabilizer(self.hash_lanes, self.occupied)
+        return [geometry.lines[i] for i in geometry.orbit_representatives(iter_bits(self.legal), symmetries)]
+
+    def get_move_history(self):
+        """Returns the lines played so far, oldest first"""
+        return [line for line, _ in self.moves]
+
+    def zobrist_key(self):
+        """Returns the 64-bit Zobrist hash of the position"""
+        return self.hash_lanes & LANE_MASK
+
+    def canonical_key(self):
+        """Returns (key, symmetry) shared by every rotation and reflection of the position"""
+        return self.geometry.canonical_key(self.hash_lanes)
+
+    def get_state(self):
+        """
+        Returns complete game state for rendering or analysis
+        """
+        return {
+            'current_player': self.current_player,
+            'line_owners': self.line_owners,
+            'triangle_owners': self.triangle_owners,
+            'game_over': self.game_over,
+            'winner': self.winner,
+            'scores': self.get_scores(),
+            'adjacency_list': self.adjacency_list,
+            'hex_size': self.hex_size,
+            'all_triangles': self.all_triangles
+        }
+
+    def get_scores(self):
+        """Returns current score for each player"""
+        if self.geometry.uniform_weights:
+            return {1: self.owned[1].bit_count(), 2: self.owned[2].bit_count()}
+        score = self.geometry.score
+        return {1: score(self.owned[1]), 2: score(self.owned[2])}
+
+    def reset(self):
+        """Resets game to initial state"""
+        self.__init__(self.hex_size, self.rules)
+
+    def copy(self):
+        """Returns a copy of the current game state; masks are ints so this is cheap"""
+        new_game = object.__new__(BitboardHexGame)
+        new_game.hex_size = self.hex_size
+        new_game.rules = self.rules
+        new_game.geometry = self.geometry
+        new_game.valid_points = self.valid_points
+        new_game.current_player = self.current_player
+        new_game.occupied = self.occupied
+        new_game.owned = dict(self.owned)
+        new_game.moves = list(self.moves)
+        new_game.legal = self.legal
+        new_game.started = self.started
+        new_game.threats = self.threats
+        new_game.hash_lanes = self.hash_lanes
+        new_game.game_over = self.game_over
+        new_game.winner = self.winner
+        new_game._views = {}
+        new_game._undo_stack = list(self._undo_stack)
+        return new_game
+
+    # Dict views matching HexGame's attributes, built lazily and cached until the next move
+
+    @property
+    def adjacency_list(self):
+        if 'adjacency_list' not in self._views:
+            adjacency_list = {}
+            for s in iter_bits(self.occupied):
+                p1, p2 = self.geometry.segments[s]
+                adjacency_list.setdefault(p1, set()).add(p2)
+                adjacency_list.setdefault(p2, set()).add(p1)
+            self._views['adjacency_list'] = adjacency_list
+        return self._views['adjacency_list']
+
+    @property
+    def line_owners(self):
+        if 'line_owners' not in self._views:
+            self._views['line_owners'] = dict(self.moves)
+        return self._views['line_owners']
+
+    @property
+    def triangle_owners(self):
+        if 'triangle_owners' not in self._views:
+            triangle_owners = {}
+            for player in (1, 2):
+                for t in iter_bits(self.owned[player]):
+                    triangle_owners[self.geometry.triangles[t]] = player
+            self._views['triangle_owners'] = triangle_owners
+        return self._views['triangle_owners']
+
+    @property
+    def all_triangles(self):
+        if 'all_triangles' not in self._views:
+            self._views['all_triangles'] = set(self.triangle_owners)
+        return self._views['all_triangles']
@@ -0,0 +1,142 @@
+"""
+Exact endgame solver.
+
+Once few legal lines are left, EndgameSolver searches every continuation to the
+end of the game and returns the proven outcome with a move that achieves it.
+Agents take it as endgame=N, solving every position with at most N legal moves:
+
+    MinimaxAgent(2, search='alphabeta', endgame=14)
+    MCTSAgent(2, endgame=14)
+
+Turns always alternate, so what the side to move can still gain over its
+opponent depends only on which segments are drawn, not on who drew them or on
+the scores so far; and once a player passes the majority no later play could
+have changed the winner. The solver therefore memoizes that net gain per
+occupied-segment mask, which stays valid for every later move of the game.
+"""
+from geometry import iter_bits
+
+WIN = 1
+DRAW = 0
+LOSS = -1
+
+# Memo entries kept before the cache is cleared, bounding its memory
+MAX_ENTRIES = 1 << 20
+
+
+class EndgameSolver:
+    """
+    Full-width alpha-beta over the remaining lines with capturing lines first.
+    solve(game) returns (outcome, move) for the side to move, outcome being WIN,
+    DRAW or LOSS, or None while more than threshold legal moves remain.
+    """
+
+    def __init__(self, threshold=14, max_entries=MAX_ENTRIES):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.nodes = 0  # Positions searched by the last solve
+        self._memo = {}  # {occupied mask: (lower, upper)} bounds on the net gain for the side to move
+        self._geometry = None
+
+    def can_solve(self, game):
+        """Whether the position is within reach: few enough legal moves, and a game whose
+        winner the final scores decide"""
+        if game.game_over or len(game.get_valid_moves()) > self.threshold:
+            return False
+        rules = game.geometry.rules
+        return rules is None or rules.win_score is None
+
+    def solve(self, game):
+        if not self.can_solve(game):
+            return None
+        geometry = game.geometry
+        if geometry is not self._geometry or len(self._memo) > self.max_entries:
+            self._memo = {}
+            self._geometry = geometry
+
+        occupied = game.occupied
+        legal = 0
+        for i, mask in enumerate(geometry.line_mask_list):
+            if not mask & occupied:
+                legal |= 1 << i
+        scores = game.get_scores()
+        lead = scores[game.current_player] - scores[3 - game.current_player]
+
+        # Only the sign of lead + gain matters, so search a window just around -lead
+        self.nodes = 0
+        alpha, beta = -lead - 1, -lead + 1
+        best, best_move = None, None
+        for i, gain in self._ordered_moves(geometry, occupied, legal):
+            value = gain - self._negamax(geometry, occupied | geometry.line_mask_list[i],
+                                         legal & ~geometry.line_block_masks[i], gain - beta, gain - alpha)
+            if best is None or value > best:
+                best, best_move = value, i
+                if value > alpha:
+                    alpha = value
+                    if alpha >= beta:
+                        break
+
+        total = lead + best
+        outcome = WIN if total > 0 else LOSS if total < 0 else DRAW
+        return outcome, geometry.lines[best_move]
+
+    def _negamax(self, geometry, occupied, legal, alpha, beta):
+        """Returns the net gain for the side to move, exact inside (alpha, beta), a bound outside it"""
+        self.nodes += 1
+        if not legal:
+            return 0
+        memo = self._memo
+        entry = memo.get(occupied)
+        if entry is not None:
+            lower, upper = entry
+            if lower >= beta:
+                return lower
+            if upper <= alpha:
+                return upper
+            if lower == upper:
+                return lower
+            alpha, beta = max(alpha, lower), min(beta, upper)
+        alpha_start = alpha
+
+        line_masks = geometry.line_mask_list
+        line_blocks = geometry.line_block_masks
+        best = None
+        for i, gain in self._ordered_moves(geometry, occupied, legal):
+            value = gain - self._negamax(geometry, occupied | line_masks[i], legal & ~line_blocks[i],
+                                         gain - beta, gain - alpha)
+            if best is None or value > best:
+                best = value
+                if value > alpha:
+                    alpha = value
+                    if alpha >= beta:
+                        break
+
+        lower, upper = entry if entry is not None else (-geometry.total_weight, geometry.total_weight)
+        if best <= alpha_start:
+            upper = min(upper, best)
+        elif best >= beta:
+            lower = max(lower, best)
+        else:
+            lower = upper = best
+        memo[occupied] = (lower, upper)
+        return best
+
+    @staticmethod
+    def _ordered_moves(geometry, occupied, legal):
+        """Returns (line index, triangles it completes) for the legal lines, biggest captures first"""
+        line_masks = geometry.line_mask_list
+        line_triangles = geometry.line_triangle_list
+        captures = []
+        quiet = []
+        for i in iter_bits(legal):
+            after = occupied | line_masks[i]
+            gain = 0
+            for weight, triangle_mask in line_triangles[i]:
+                if after & triangle_mask == triangle_mask:
+                    gain += weight
+            if gain:
+                captures.append((i, gain))
+            else:
+                quiet.append((i, 0))
+        captures.sort(key=lambda move: move[1], reverse=True)
+        return captures + quiet
@@ -0,0 +1,58 @@
+"""
+Threat-aware position evaluation for MinimaxAgent(evaluation='threats').
+
+Built on the triangle masks the engines keep up to date with every move:
+game.threats marks unclaimed triangles with two edges drawn, which any line over
+the missing edge completes, and game.started marks triangles with one edge.
+Values are in quarter triangles, from the side to move.
+"""
+from geometry import iter_bits
+
+TRIANGLE_VALUE = 4
+
+
+def capture_gains(game):
+    """Returns {line index: triangles it would complete} for every legal capturing line"""
+    geometry = game.geometry
+    occupied = game.occupied
+    line_masks = geometry.line_mask_list
+    gains = {}
+    for t in iter_bits(game.threats):
+        for s in geometry.triangle_edges[t]:
+            if not occupied >> s & 1:
+                break
+        for line in iter_bits(geometry.segment_line_masks[s]):
+            if not line_masks[line] & occupied:
+                gains[line] = gains.get(line, 0) + 1
+    return gains
+
+
+def safe_segments(game):
+    """Counts undrawn segments that touch no triangle with an edge already drawn"""
+    geometry = game.geometry
+    touched = game.occupied
+    for t in iter_bits(game.started | game.threats):
+        touched |= geometry.triangle_masks[t]
+    return (geometry.all_segments_mask & ~touched).bit_count()
+
+
+def evaluate_threats(game, gains=None):
+    """
+    Scores the position for the player to move: triangles owned, plus the best
+    capture available now less the opponent's expected reply, plus a tempo point
+    for whoever will make the last quiet move. Turns always alternate, so every
+    open triangle goes to the next player to draw its missing edge.
+    """
+    player = game.current_player
+    scores = game.get_scores()
+    value = TRIANGLE_VALUE * (scores[player] - scores[3 - player])
+    if game.threats and gains is None:
+        gains = capture_gains(game)
+    if gains:  # Under some rules no playable line completes a threatened triangle
+        ordered = sorted(gains.values(), reverse=True)
+        best = ordered[0]
+        left = game.threats.bit_count() - best
+        reply = min(left, ordered[1]) if len(ordered) > 1 else 0
+        value += TRIANGLE_VALUE * best - TRIANGLE_VALUE // 2 * reply
+    value += 1 if safe_segments(game) % 2 else -1
+    return value
@@ -1,5 +1,8 @@
+from geometry import LANE_MASK, LineSet, get_geometry, iter_bits
+
+
 class HexGame:
-    def __init__(self):
+    def __init__(self, hex_size=3):
         self.current_player = 1
         self.adjacency_list = {}
         self.line_owners = {}
@@ -7,41 +10,27 @@ class HexGame:
         self.all_triangles = set()
         self.game_over = False
         self.winner = None
-        self.hex_size = 3
-        self.valid_points = self.get_valid_points()
+        self.hex_size = hex_size
+        self.geometry = get_geometry(self.hex_size)  # Shared by every game of this size, never copied
+        self.valid_points = self.geometry.points
+        self.legal = self.geometry.all_lines_mask  # Bitmask over geometry.lines with no drawn segment, kept up to date by add_connection
+        self._scores = {1: 0, 2: 0}  # Triangles owned by each player, kept up to date by add_connection
+        self.hash_lanes = 0  # Packed Zobrist hashes, see BoardGeometry._build_zobrist_keys
+        self.occupied = 0  # Bitmask over geometry.segments, the same drawn segments as adjacency_list
+        self.started = 0  # Bitmask over geometry.triangles with exactly one edge drawn
+        self.threats = 0  # Bitmask over geometry.triangles with two edges drawn, one segment from completion
+        self._undo_stack = []  # One entry per push_move, consumed by pop_move
         
     def get_valid_points(self):
         """Returns list of all valid (row, col) coordinates on the hex grid"""
-        valid_points = []
-        # First half - increasing columns (including middle row)
-
-        for col in range(self.hex_size):
-            for row in range(col + self.hex_size):
-                valid_points.append((row, col))
-        
-        max_col = self.hex_size * 2 - 2
-
-        count = 1
-        for col in range(self.hex_size, max_col + 1):
-            for row in range(count, max_col + 1):
-                valid_points.append((row, col))
-            count += 1
-                
-        return valid_points
+        return list(self.geometry.points)
     
     def get_valid_moves(self):
-        """Returns list of all valid moves (point1, point2) that can be made"""
-        valid_moves = set()
-        points = self.get_valid_points()
-        
-        
-        for p1 in points:
-            for p2 in points:                
-                if self.is_valid_connection(p1, p2):
-                    if tuple(sorted([p1, p2])) not in self.line_owners:
-                        valid_moves.add(tuple(sorted([p1, p2])))
-
-        return valid_moves
+        """
+        Returns the set of all valid moves (point1, point2) that can be made,
+        as an O(1) snapshot view of the legal-line mask.
+        """
+        return LineSet(self.geometry, self.legal)
     
     def make_move(self, point1, point2):
         """
@@ -60,11 +49,13 @@ class HexGame:
             
         new_triangles = self.add_connection(point1, point2)
 
-        if(self.get_scores()[1] > (3 * self.hex_size - 3) * (self.hex_size - 1) or self.get_scores()[2] > (3 * self.hex_size - 3) * (self.hex_size - 1)):
+        majority = self.geometry.majority
+        score1, score2 = self._scores[1], self._scores[2]
+        if score1 > majority or score2 > majority:
             self.game_over = True
             self.winner = 3 - self.current_player
 
-        if(self.get_scores()[1] == (3 * self.hex_size - 3) * (self.hex_size - 1) and self.get_scores()[2] == (3 * self.hex_size - 3) * (self.hex_size - 1)):
+        if score1 == majority and score2 == majority:
             self.game_over = True
             self.winner = 0
         
@@ -76,6 +67,87 @@ class HexGame:
             'current_player': self.current_player
         }
     
+    def push_move(self, point1, point2):
+        """
+        Makes a move that can be undone with pop_move. Only the changes made by
+        the move are recorded, so undoing costs O(line length) instead of a copy.
+        Returns whether the move was valid and applied.
+        """
+        if not self.is_valid_connection(point1, point2):
+            return False
+
+        points = self._line_points(point1, point2)
+        new_points = [point for point in points if point not in self.adjacency_list]
+        blocked = self._lines_through(points) & self.legal
+        line = tuple(sorted([point1, point2]))
+        player, game_over, winner = self.current_player, self.game_over, self.winner
+        masks = (self.hash_lanes, self.occupied, self.started, self.threats)
+
+        result = self.make_move(point1, point2)
+        self._undo_stack.append(
+            (line, points, new_points, blocked, result['triangles_formed'], player, game_over, winner, masks))
+        return True
+
+    def pop_move(self):
+        """Undoes the most recent push_move"""
+        line, points, new_points, blocked, triangles, player, game_over, winner, masks = self._undo_stack.pop()
+
+        for curr_point, next_point in zip(points, points[1:]):
+            self.adjacency_list[curr_point].discard(next_point)
+            self.adjacency_list[next_point].discard(curr_point)
+        for point in new_points:
+            del self.adjacency_list[point]
+
+        del self.line_owners[line]
+        self.legal |= blocked
+        for triangle in triangles:
+            self.all_triangles.discard(triangle)
+            del self.triangle_owners[triangle]
+        self._scores[player] -= len(triangles)
+
+        self.current_player = player
+        self.game_over = game_over
+        self.winner = winner
+        self.hash_lanes, self.occupied, self.started, self.threats = masks
+
+    def _line_points(self, point1, point2):
+        """Returns every point on the straight line from the smaller to the larger endpoint"""
+        if point1 > point2:
+            point1, point2 = point2, point1
+        steps = max(abs(point2[0] - point1[0]), abs(point2[1] - point1[1]))
+        d_row = (point2[0] - point1[0]) // steps
+        d_col = (point2[1] - point1[1]) // steps
+        return [(point1[0] + d_row * i, point1[1] + d_col * i) for i in range(steps + 1)]
+
+    def _lines_through(self, points):
+        """Returns the mask of catalog lines crossing any unit segment between consecutive points"""
+        lines = 0
+        for curr_point, next_point in zip(points, points[1:]):
+            lines |= self.geometry.segment_line_masks[self.geometry.segment_index[(curr_point, next_point)]]
+        return lines
+
+    def get_unique_moves(self):
+        """
+        Returns one valid move per orbit under the symmetries this position keeps,
+        so moves that lead to mirror images of each other are listed once. Each
+        move is a real move in this position and can be played as is.
+        """
+        geometry = self.geometry
+        symmetries = geometry.stabilizer(self.hash_lanes, self.occupied)
+        return [geometry.lines[i] for i in geometry.orbit_representatives(iter_bits(self.legal), symmetries)]
+
+    def get_move_history(self):
+        """Returns the lines played so far, oldest first"""
+        return list(self.line_owners)
+
+    def zobrist_key(self):
+        """Returns the 64-bit Zobrist hash of the position"""
+        return self.hash_lanes & LANE_MASK
+
+    def canonical_key(self):
+        """Returns (key, symmetry) shared by every rotation and reflection of the position"""
+        return self.geometry.canonical_key(self.hash_lanes)
+
     def get_state(self):
         """
         Returns complete game state for rendering or analysis
@@ -94,61 +166,18 @@ class HexGame:
     
     def get_scores(self):
         """Returns current score for each player"""
-        p1_triangles = sum(1 for owner in self.triangle_owners.values() if owner == 1)
-        p2_triangles = sum(1 for owner in self.triangle_owners.values() if owner == 2)
-        return {1: p1_triangles, 2: p2_triangles}
+        return {1: self._scores[1], 2: self._scores[2]}
     
     def reset(self):
         """Resets game to initial state"""
-        self.__init__()
-
-    def is_valid_connection(self,point1, point2):
+        self.__init__(self.hex_size)
 
-
-        
-        row1, col1 = point1
-        row2, col2 = point2
-
-        if point1 == point2:
-            return False
-        
-        # Sort points so row1 <= row2
-        if row1 > row2:
-            row1, row2 = row2, row1
-            col1, col2 = col2, col1
-        
-        row_diff = row2 - row1
-        col_diff = col2 - col1
-        
-        # Only row changing
-        if col1 == col2:
-            for row in range(min(row1, row2), max(row1, row2)):
-                point = (row, col1)
-                next_point = (row + 1, col1)
-                if(point in self.adjacency_list.get(next_point, set())):
-                    return False
-                
-            return True
-        # Only column changing
-        elif row1 == row2:
-            for col in range(min(col1, col2), max(col1, col2)):
-                point = (row1, col)
-                next_point = (row1, col + 1)
-                if(point in self.adjacency_list.get(next_point, set())):
-                    return False
-                
-            return True
-        
-        # Both changing equally
-        elif row_diff == col_diff:
-            for i in range(abs(row2 - row1)):
-                point = (min(row1, row2) + i, min(col1, col2) + i)
-                next_point = (min(row1, row2) + i + 1, min(col1, col2) + i + 1)
-                if(point in self.adjacency_list.get(next_point, set())):
-                    return False
-                
-            return True
-        return False
+    def is_valid_connection(self, point1, point2):
+        """A move is valid when it is a straight line on the board with no segment drawn yet"""
+        if point1 > point2:
+            point1, point2 = point2, point1
+        i = self.geometry.line_index.get((point1, point2))
+        return i is not None and bool(self.legal >> i & 1)
     
     def find_triangles_for_line(self,points):
         triangles = set()
@@ -238,6 +267,9 @@ class HexGame:
         # Store the line owner
         line = tuple(sorted([p1, p2]))
         self.line_owners[line] = self.current_player
+
+        # Drop every line crossing the new segments from the legal moves
+        self.legal &= ~self._lines_through(points)
         
         # After adding connections, check for new triangles
         triangles = self.find_triangles_for_line(points)
@@ -247,6 +279,30 @@ class HexGame:
                 new_triangles.add(triangle)
                 self.all_triangles.add(triangle)
                 self.triangle_owners[triangle] = self.current_player
+        self._scores[self.current_player] += len(new_triangles)
+
+        # Update the Zobrist hashes and segment / triangle masks with the new segments,
+        # triangles and side to move
+        hash_lanes = self.hash_lanes ^ self.geometry.side_key
+        segments = [self.geometry.segment_index[(curr_point, next_point)]
+                    for curr_point, next_point in zip(points, points[1:])]
+        for s in segments:
+            hash_lanes ^= self.geometry.segment_keys[s]
+            self.occupied |= 1 << s
+        for s in segments:
+            for bit, triangle_mask in self.geometry.segment_triangles[s]:
+                drawn = self.occupied & triangle_mask
+                if drawn == triangle_mask:
+                    self.threats &= ~bit
+                    self.started &= ~bit
+                elif drawn & (drawn - 1):  # Two edges
+                    self.threats |= bit
+                    self.started &= ~bit
+                else:
+                    self.started |= bit
+        for triangle in new_triangles:
+            hash_lanes ^= self.geometry.triangle_keys[self.current_player][self.geometry.triangle_index[triangle]]
+        self.hash_lanes = hash_lanes
         
         # Switch players
         self.current_player = 3 - self.current_player  # Toggles between 1 and 2
@@ -266,6 +322,14 @@ class HexGame:
         new_game.winner = self.winner
         new_game.hex_size = self.hex_size
         new_game.valid_points = self.valid_points  # No need to copy since it's immutable
+        new_game.geometry = self.geometry  # Shared, immutable
+        new_game.legal = self.legal
+        new_game._scores = dict(self._scores)
+        new_game.hash_lanes = self.hash_lanes
+        new_game.occupied = self.occupied
+        new_game.started = self.started
+        new_game.threats = self.threats
+        new_game._undo_stack = list(self._undo_stack)  # Entries are never mutated
         return new_game
 
 if __name__ == "__main__":
@@ -0,0 +1,275 @@
+"""
+Compact binary game records, streaming replay and training-data export.
+
+A record file is a header followed by games:
+
+    header  magic 'TRGLREC1', version, hex_size, rules        (12 bytes)
+    game    move count (uint16), winner (int8, -1 if unfinished),
+            then one uint16 index into geometry.lines per move
+
+Replay runs on integer bitmasks straight from the line catalog, so reading
+millions of positions never builds a game object per position:
+
+    python tournament.py --games 1000 --records games.bin
+    python game_record.py export games.bin dataset/
+"""
+import argparse
+import array
+import os
+import struct
+import sys
+
+from geometry import get_geometry
+
+MAGIC = b'TRGLREC1'
+VERSION = 1
+HEADER = struct.Struct('<8sBBBx')  # magic, version, hex_size, rules
+GAME = struct.Struct('<Hb')  # move count, winner
+
+# Win conditions a record can be played under
+RULES = {'majority': 0}  # First past half the triangles wins, both exactly at half draw
+
+
+def encode_moves(game):
+    """Returns the game's moves as an array of line indices"""
+    line_index = game.geometry.line_index
+    return array.array('H', [line_index[line] for line in game.get_move_history()])
+
+
+class GameRecordWriter:
+    """Appends games to a record file, writing the header when the file is new"""
+
+    def __init__(self, path, hex_size=3, rules='majority'):
+        self.hex_size = hex_size
+        self.rules = rules
+        exists = os.path.exists(path) and os.path.getsize(path) > 0
+        if exists:
+            reader = GameRecordReader(path)
+            if (reader.hex_size, reader.rules) != (hex_size, rules):
+                raise ValueError(f"{path} holds {reader.rules} games of size {reader.hex_size}")
+            # Drop a game left half-written by an interrupted run
+            _, _, end = reader._scan()
+            os.truncate(path, end)
+        self._file = open(path, 'ab')
+        if not exists:
+            self._file.write(HEADER.pack(MAGIC, VERSION, hex_size, RULES[rules]))
+
+    def write(self, game):
+        """Appends a game (HexGame or BitboardHexGame) of this writer's size"""
+        if game.hex_size != self.hex_size:
+            raise ValueError(f"Game of size {game.hex_size} written to a size {self.hex_size} record file")
+        if getattr(game, 'rules', None) is not None:
+            raise ValueError("Only games under the standard rules can be recorded")
+        self.write_moves(encode_moves(game), game.winner)
+
+    def write_moves(self, moves, winner):
+        """Appends a game given as line indices and its winner (None if unfinished)"""
+        self._file.write(GAME.pack(len(moves), -1 if winner is None else winner))
+        moves = array.array('H', moves)
+        if sys.byteorder == 'big':
+            moves.byteswap()  # Records are little-endian
+        self._file.write(moves.tobytes())
+
+    def flush(self):
+        """Hands written games to the OS, so they survive the process being killed"""
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _read_header(f, path):
+    data = f.read(HEADER.size)
+    if len(data) < HEADER.size:
+        raise ValueError(f"{path} is not a game record file")
+    magic, version, hex_size, rules = HEADER.unpack(data)
+    names = {number: name for name, number in RULES.items()}
+    if magic != MAGIC or version != VERSION or rules not in names:
+        raise ValueError(f"{path} is not a version {VERSION} game record file")
+    return hex_size, names[rules]
+
+
+class GameRecordReader:
+    """Streams the games of a record file without loading it into memory"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self.hex_size, self.rules = _read_header(f, path)
+        self.geometry = get_geometry(self.hex_size)
+
+    def __iter__(self):
+        """Yields (moves, winner) per game, moves as an array of line indices"""
+        with open(self.path, 'rb', buffering=1 << 20) as f:
+            f.seek(HEADER.size)
+            while True:
+                data = f.read(GAME.size)
+                if len(data) < GAME.size:
+                    return  # End of file, or a game cut off by an interrupted writer
+                count, winner = GAME.unpack(data)
+                body = f.read(2 * count)
+                if len(body) < 2 * count:
+                    return
+                moves = array.array('H')
+                moves.frombytes(body)
+                if sys.byteorder == 'big':
+                    moves.byteswap()
+                yield moves, None if winner < 0 else winner
+
+    def count(self):
+        """Returns (games, positions) by skipping through the game headers"""
+        return self._scan()[:2]
+
+    def _scan(self):
+        """Returns (games, positions, offset just past the last complete game)"""
+        games = positions = 0
+        size = os.path.getsize(self.path)
+        with open(self.path, 'rb') as f:
+            offset = HEADER.size
+            while offset + GAME.size <= size:
+                f.seek(offset)
+                count, _ = GAME.unpack(f.read(GAME.size))
+                if offset + GAME.size + 2 * count > size:
+                    break
+                offset += GAME.size + 2 * count
+                games += 1
+                positions += count
+        return games, positions, offset
+
+    def positions(self):
+        """
+        Yields (occupied, owned, legal, player, move, winner) before every move of
+        every game: segment, triangle and line bitmasks, owned as a (player 1,
+        player 2) pair, and move the index of the line played from there.
+        """
+        for moves, winner in self:
+            for state in replay(self.geometry, moves):
+                yield state + (winner,)
+
+
+def replay(geometry, moves):
+    """
+    Yields (occupied, owned, legal, player, move) before each move, applying the
+    moves to plain integer masks the same way BitboardHexGame does.
+    """
+    occupied = 0
+    owned = [0, 0, 0]
+    legal = geometry.all_lines_mask
+    player = 1
+    line_mask_list = geometry.line_mask_list
+    line_segment_list = geometry.line_segment_list
+    segment_line_masks = geometry.segment_line_masks
+    segment_triangles = geometry.segment_triangles
+    for move in moves:
+        yield occupied, (owned[1], owned[2]), legal, player, move
+        occupied |= line_mask_list[move]
+        for s in line_segment_list[move]:
+            legal &= ~segment_line_masks[s]
+            for bit, triangle_mask in segment_triangles[s]:
+                if occupied & triangle_mask == triangle_mask:
+                    owned[player] |= bit
+        player = 3 - player
+
+
+def export_dataset(record_path, output_dir, chunk_size=8192):
+    """
+    Writes every position of a record file as memory-mapped .npy arrays:
+
+        segments   (N, segments) uint8     - drawn unit segments
+        triangles  (N, 2, triangles) uint8 - triangles of the player to move, then the opponent
+        legal      (N, lines) bool         - legal-move mask
+        moves      (N,) uint16             - line index played
+        outcomes   (N,) int8               - +1 if the player to move went on to win, -1 lose, 0 draw
+
+    Positions are unpacked chunk_size at a time, so memory use does not grow with
+    the file. Returns the number of positions written.
+    """
+    import numpy as np
+    from numpy.lib.format import open_memmap
+
+    reader = GameRecordReader(record_path)
+    geometry = reader.geometry
+    _, total = reader.count()
+    sizes = {'segments': len(geometry.segments), 'triangles': len(geometry.triangles), 'lines': len(geometry.lines)}
+    nbytes = {name: (size + 7) // 8 for name, size in sizes.items()}
+
+    os.makedirs(output_dir, exist_ok=True)
+
+    def create(name, dtype, shape):
+        return open_memmap(os.path.join(output_dir, f"{name}.npy"), mode='w+', dtype=dtype, shape=shape)
+
+    arrays = {
+        'segments': create('segments', np.uint8, (total, sizes['segments'])),
+        'triangles': create('triangles', np.uint8, (total, 2, sizes['triangles'])),
+        'legal': create('legal', np.bool_, (total, sizes['lines'])),
+        'moves': create('moves', np.uint16, (total,)),
+        'outcomes': create('outcomes', np.int8, (total,))
+    }
+
+    def unpack(buffer, rows, name):
+        packed = np.frombuffer(bytes(buffer), dtype=np.uint8).reshape(rows, nbytes[name])
+        return np.unpackbits(packed, axis=1, bitorder='little')[:, :sizes[name]]
+
+    def flush(start, chunk):
+        rows = len(chunk['moves'])
+        end = start + rows
+        arrays['segments'][start:end] = unpack(chunk['segments'], rows, 'segments')
+        arrays['triangles'][start:end, 0] = unpack(chunk['mine'], rows, 'triangles')
+        arrays['triangles'][start:end, 1] = unpack(chunk['theirs'], rows, 'triangles')
+        arrays['legal'][start:end] = unpack(chunk['legal'], rows, 'lines')
+        arrays['moves'][start:end] = chunk['moves']
+        arrays['outcomes'][start:end] = chunk['outcomes']
+        return end
+
+    def new_chunk():
+        return {'segments': bytearray(), 'mine': bytearray(), 'theirs': bytearray(), 'legal': bytearray(),
+                'moves': [], 'outcomes': []}
+
+    written = 0
+    chunk = new_chunk()
+    for occupied, owned, legal, player, move, winner in reader.positions():
+        chunk['segments'] += occupied.to_bytes(nbytes['segments'], 'little')
+        chunk['mine'] += owned[player - 1].to_bytes(nbytes['triangles'], 'little')
+        chunk['theirs'] += owned[2 - player].to_bytes(nbytes['triangles'], 'little')
+        chunk['legal'] += legal.to_bytes(nbytes['lines'], 'little')
+        chunk['moves'].append(move)
+        chunk['outcomes'].append(0 if not winner else (1 if winner == player else -1))
+        if len(chunk['moves']) == chunk_size:
+            written = flush(written, chunk)
+            chunk = new_chunk()
+    if chunk['moves']:
+        written = flush(written, chunk)
+
+    for array_ in arrays.values():
+        array_.flush()
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect game record files and export training data")
+    commands = parser.add_subparsers(dest='command', required=True)
+    info = commands.add_parser('info', help="Print board size, rules and counts")
+    info.add_argument('records')
+    export = commands.add_parser('export', help="Write positions as .npy arrays")
+    export.add_argument('records')
+    export.add_argument('output_dir')
+    export.add_argument('--chunk-size', type=int, default=8192)
+    args = parser.parse_args()
+
+    if args.command == 'info':
+        reader = GameRecordReader(args.records)
+        games, positions = reader.count()
+        print(f"hex_size={reader.hex_size} rules={reader.rules} games={games} positions={positions}")
+    else:
+        count = export_dataset(args.records, args.output_dir, args.chunk_size)
+        print(f"Wrote {count} positions to {args.output_dir}")
+
+
+if __name__ == "__main__":
+    main()
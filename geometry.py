@@ -0,0 +1,362 @@
+import random
+from collections.abc import Set
+from functools import lru_cache
+
+# Unit steps between neighboring points; every straight line runs along one of these
+DIRECTIONS = ((1, 0), (0, 1), (1, 1))
+
+# Zobrist hashes keep one 64-bit lane per board symmetry, packed side by side into one int
+LANE_BITS = 64
+LANE_MASK = (1 << LANE_BITS) - 1
+
+
+def valid_points_for_size(hex_size):
+    """Returns list of all valid (row, col) coordinates on a hex grid of the given size"""
+    valid_points = []
+    for col in range(hex_size):
+        for row in range(col + hex_size):
+            valid_points.append((row, col))
+
+    max_col = hex_size * 2 - 2
+
+    count = 1
+    for col in range(hex_size, max_col + 1):
+        for row in range(count, max_col + 1):
+            valid_points.append((row, col))
+        count += 1
+
+    return valid_points
+
+
+class BoardGeometry:
+    """
+    Immutable catalog of everything derived from hex_size and the rules: points,
+    unit segments, small triangles and playable lines. Segments and triangles are
+    numbered so that game state can be kept as integer bitmasks over them.
+    rules is a rules.Rules variant, or None for the standard game.
+    """
+
+    def __init__(self, hex_size, rules=None):
+        self.hex_size = hex_size
+        self.rules = rules
+        if rules is not None and rules.points is not None:
+            points = rules.points
+        else:
+            points = valid_points_for_size(hex_size)
+        if rules is not None:
+            points = [point for point in points if point not in rules.removed_points]
+        self.points = tuple(points)
+        self.point_index = {point: i for i, point in enumerate(self.points)}
+
+        # Unit segments, stored with the smaller point first
+        self.segments = []
+        for point in self.points:
+            for d_row, d_col in DIRECTIONS:
+                neighbor = (point[0] + d_row, point[1] + d_col)
+                if neighbor in self.point_index:
+                    self.segments.append((point, neighbor))
+        self.segments = tuple(self.segments)
+        self.segment_index = {segment: i for i, segment in enumerate(self.segments)}
+
+        # Small triangles: (r, c) with either (r + 1, c) or (r, c + 1), closed by (r + 1, c + 1)
+        self.triangles = []
+        self.triangle_masks = []
+        for row, col in self.points:
+            corner = (row + 1, col + 1)
+            for third in ((row + 1, col), (row, col + 1)):
+                triangle = tuple(sorted([(row, col), third, corner]))
+                edges = [(triangle[0], triangle[1]), (triangle[0], triangle[2]), (triangle[1], triangle[2])]
+                if all(edge in self.segment_index for edge in edges):
+                    self.triangles.append(triangle)
+                    mask = 0
+                    for edge in edges:
+                        mask |= 1 << self.segment_index[edge]
+                    self.triangle_masks.append(mask)
+        self.triangles = tuple(self.triangles)
+        self.triangle_masks = tuple(self.triangle_masks)
+        self.triangle_index = {triangle: i for i, triangle in enumerate(self.triangles)}
+        self.triangle_edges = tuple(tuple(iter_bits(mask)) for mask in self.triangle_masks)
+        self.all_segments_mask = (1 << len(self.segments)) - 1
+
+        # For each segment, the triangles it can close as (triangle_bit, triangle_mask) pairs
+        segment_triangles = [[] for _ in self.segments]
+        for t, mask in enumerate(self.triangle_masks):
+            for s in range(len(self.segments)):
+                if mask >> s & 1:
+                    segment_triangles[s].append((1 << t, mask))
+        self.segment_triangles = tuple(tuple(entry) for entry in segment_triangles)
+
+        # Triangle weights; scores are plain bit counts unless some triangle is worth more
+        weights = {} if rules is None else dict(rules.triangle_weights)
+        unknown = set(weights) - set(self.triangle_index)
+        if unknown:
+            raise ValueError(f"Weighted triangles not on the board: {sorted(unknown)}")
+        self.triangle_weights = tuple(weights.get(triangle, 1) for triangle in self.triangles)
+        self.total_weight = sum(self.triangle_weights)
+        self.uniform_weights = all(weight == 1 for weight in self.triangle_weights)
+        classes = {}
+        for t, weight in enumerate(self.triangle_weights):
+            classes[weight] = classes.get(weight, 0) | 1 << t
+        self.weight_classes = tuple(sorted(classes.items()))
+        self.segment_triangle_weights = tuple(
+            tuple((self.triangle_weights[bit.bit_length() - 1], mask) for bit, mask in entry)
+            for entry in self.segment_triangles)
+
+        # Every straight line between two points, keyed by its sorted endpoints
+        line_lengths = None if rules is None else rules.line_lengths
+        self.lines = []
+        self.line_masks = {}
+        self.line_segments = {}
+        for d_row, d_col in DIRECTIONS:
+            for start in self.points:
+                before = (start[0] - d_row, start[1] - d_col)
+                if before in self.point_index:
+                    continue  # Only walk each maximal run once, from its first point
+                run = [start]
+                while True:
+                    nxt = (run[-1][0] + d_row, run[-1][1] + d_col)
+                    if nxt not in self.point_index:
+                        break
+                    run.append(nxt)
+                run_segments = [self.segment_index[(run[i], run[i + 1])] for i in range(len(run) - 1)]
+                for i in range(len(run)):
+                    for j in range(i + 1, len(run)):
+                        if line_lengths is not None and j - i not in line_lengths:
+                            continue
+                        segments = tuple(run_segments[i:j])
+                        mask = 0
+                        for s in segments:
+                            mask |= 1 << s
+                        self.lines.append((run[i], run[j]))
+                        self.line_masks[(run[i], run[j])] = mask
+                        self.line_segments[(run[i], run[j])] = segments
+
+        # Bent lines: two unit segments meeting at an angle, keyed by (end, end, corner)
+        if rules is not None and rules.bent_lines:
+            for corner in self.points:
+                arms = [a if b == corner else b for a, b in self.segments if corner in (a, b)]
+                for a in arms:
+                    for b in arms:
+                        if a < b and (a[0] + b[0], a[1] + b[1]) != (2 * corner[0], 2 * corner[1]):
+                            segments = (self.segment_index[tuple(sorted((a, corner)))],
+                                        self.segment_index[tuple(sorted((corner, b)))])
+                            line = (a, b, corner)
+                            self.lines.append(line)
+                            self.line_masks[line] = (1 << segments[0]) | (1 << segments[1])
+                            self.line_segments[line] = segments
+        self.lines = tuple(sorted(self.lines))
+        self.line_index = {line: i for i, line in enumerate(self.lines)}
+
+        # For each segment, the lines that cross it and become blocked once it is drawn
+        segment_lines = [[] for _ in self.segments]
+        for line in self.lines:
+            for s in self.line_segments[line]:
+                segment_lines[s].append(line)
+        self.segment_lines = tuple(tuple(entry) for entry in segment_lines)
+        self.segment_line_masks = tuple(sum(1 << self.line_index[line] for line in entry) for entry in segment_lines)
+        self.all_lines_mask = (1 << len(self.lines)) - 1
+
+        # Per line index: its segment mask and its segments
+        self.line_mask_list = tuple(self.line_masks[line] for line in self.lines)
+        self.line_segment_list = tuple(self.line_segments[line] for line in self.lines)
+
+        # Per line index: the lines it blocks, i.e. every line sharing a segment with it, itself included
+        self.line_block_masks = []
+        for segments in self.line_segment_list:
+            blocked = 0
+            for s in segments:
+                blocked |= self.segment_line_masks[s]
+            self.line_block_masks.append(blocked)
+        self.line_block_masks = tuple(self.line_block_masks)
+
+        # Per line index: the (weight, triangle_mask) of every triangle it touches, each
+        # listed once even when a bent line draws two of its edges
+        self.line_triangle_list = tuple(
+            tuple(dict.fromkeys(entry for s in segments for entry in self.segment_triangle_weights[s]))
+            for segments in self.line_segment_list)
+        # The unit line of a segment is the shortest straight line drawing it, None if no line can
+        self.segment_unit_lines = tuple(
+            self.line_index[min(entry, key=lambda line: (len(self.line_segments[line]), len(line)))] if entry else None
+            for entry in segment_lines)
+
+        # A player wins by scoring more than majority; both scoring draw_score is a draw.
+        # In the standard game that is more than half of the triangles, or exactly half each
+        win_score = None if rules is None else rules.win_score
+        if win_score is None:
+            self.majority = self.total_weight // 2
+            self.draw_score = self.total_weight // 2 if self.total_weight % 2 == 0 else -1
+        else:
+            self.majority = win_score - 1
+            self.draw_score = -1  # Only the first to reach win_score ends the game early
+
+        self._build_symmetries()
+        self._build_zobrist_keys()
+
+    def _build_symmetries(self):
+        """
+        Builds the rotations and reflections of the hexagon that map the board and
+        its rules onto themselves (all 12 for the standard game) as permutations
+        of points, segments, triangles and lines. Index 0 is the identity.
+        """
+        center = self.hex_size - 1
+
+        def rotate(x, y):
+            return x - y, x  # 60 degrees about the center
+
+        transforms = []
+        for reflect in (False, True):
+            for turns in range(6):
+                def transform(point, turns=turns, reflect=reflect):
+                    x, y = point[0] - center, point[1] - center
+                    if reflect:
+                        x, y = y, x
+                    for _ in range(turns):
+                        x, y = rotate(x, y)
+                    return (x + center, y + center)
+                transforms.append(transform)
+
+        def map_line(line, point_map):
+            a, b = sorted((point_map[line[0]], point_map[line[1]]))
+            return (a, b) if len(line) == 2 else (a, b, point_map[line[2]])
+
+        self.point_perms = []
+        self.segment_perms = []
+        self.triangle_perms = []
+        self.line_perms = []
+        for transform in transforms:
+            point_map = {point: transform(point) for point in self.points}
+            if any(point not in self.point_index for point in point_map.values()):
+                continue  # Moves part of the board off it
+            line_perm = tuple(self.line_index.get(map_line(line, point_map)) for line in self.lines)
+            triangle_perm = tuple(
+                self.triangle_index[tuple(sorted(point_map[p] for p in triangle))] for triangle in self.triangles)
+            if None in line_perm or any(self.triangle_weights[t] != self.triangle_weights[image]
+                                        for t, image in enumerate(triangle_perm)):
+                continue  # Doesn't preserve the rules
+            self.point_perms.append(tuple(self.point_index[point_map[p]] for p in self.points))
+            self.segment_perms.append(tuple(
+                self.segment_index[tuple(sorted((point_map[a], point_map[b])))] for a, b in self.segments))
+            self.triangle_perms.append(triangle_perm)
+            self.line_perms.append(line_perm)
+        self.point_perms = tuple(self.point_perms)
+        self.segment_perms = tuple(self.segment_perms)
+        self.triangle_perms = tuple(self.triangle_perms)
+        self.line_perms = tuple(self.line_perms)
+
+        # symmetry_inverse[g] undoes symmetry g
+        identity = self.line_perms[0]
+        count = len(self.line_perms)
+        self.symmetry_inverse = tuple(
+            next(h for h in range(count)
+                 if tuple(self.line_perms[h][self.line_perms[g][i]] for i in identity) == identity)
+            for g in range(count))
+
+    def _build_zobrist_keys(self):
+        """
+        Builds Zobrist keys for drawn segments, owned triangles and the side to move.
+        Lane g of each packed key is the key of the element's image under symmetry g,
+        so one XOR updates the hash of all symmetric copies of a position. Keys are
+        seeded by board size so hashes are identical across processes and runs.
+        """
+        rng = random.Random(0x7219 + self.hex_size)
+        count = len(self.segment_perms)
+
+        def pack(base, perms, i):
+            return sum(base[perms[g][i]] << (LANE_BITS * g) for g in range(count))
+
+        segment_base = [rng.getrandbits(LANE_BITS) for _ in self.segments]
+        self.segment_keys = tuple(pack(segment_base, self.segment_perms, s) for s in range(len(self.segments)))
+
+        self.triangle_keys = {}
+        for player in (1, 2):
+            triangle_base = [rng.getrandbits(LANE_BITS) for _ in self.triangles]
+            self.triangle_keys[player] = tuple(
+                pack(triangle_base, self.triangle_perms, t) for t in range(len(self.triangles)))
+
+        side = rng.getrandbits(LANE_BITS)
+        self.side_key = sum(side << (LANE_BITS * g) for g in range(count))
+
+    def canonical_key(self, hash_lanes):
+        """
+        Returns (key, symmetry) for the smallest of the symmetric hashes packed in
+        hash_lanes. Mirrored and rotated positions share the same key.
+        """
+        best_key, best_symmetry = hash_lanes & LANE_MASK, 0
+        for g in range(1, len(self.segment_perms)):
+            key = hash_lanes >> (LANE_BITS * g) & LANE_MASK
+            if key < best_key:
+                best_key, best_symmetry = key, g
+        return best_key, best_symmetry
+
+    def stabilizer(self, hash_lanes, occupied):
+        """
+        Returns the symmetries that map the position onto itself: those whose hash
+        lane equals the identity lane, confirmed against the drawn segments.
+        """
+        key = hash_lanes & LANE_MASK
+        symmetries = [0]
+        for g in range(1, len(self.segment_perms)):
+            if hash_lanes >> (LANE_BITS * g) & LANE_MASK == key:
+                perm = self.segment_perms[g]
+                image = 0
+                for s in iter_bits(occupied):
+                    image |= 1 << perm[s]
+                if image == occupied:
+                    symmetries.append(g)
+        return symmetries
+
+    def orbit_representatives(self, line_indices, symmetries):
+        """Keeps the smallest line index of each orbit under the given symmetries"""
+        if len(symmetries) == 1:
+            return list(line_indices)
+        perms = [self.line_perms[g] for g in symmetries[1:]]
+        return [i for i in line_indices if all(perm[i] >= i for perm in perms)]
+
+    def score(self, owned):
+        """Returns what a mask of owned triangles is worth under the triangle weights"""
+        if self.uniform_weights:
+            return owned.bit_count()
+        return sum(weight * (owned & mask).bit_count() for weight, mask in self.weight_classes)
+
+
+@lru_cache(maxsize=None)
+def get_geometry(hex_size, rules=None):
+    """
+    Returns the shared BoardGeometry for a board size and rules.Rules variant,
+    building it on first use
+    """
+    return BoardGeometry(hex_size, rules)
+
+
+def iter_bits(mask):
+    """Yields the index of every set bit in mask, lowest first"""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+class LineSet(Set):
+    """
+    Read-only set of lines backed by a bitmask over geometry.lines. Creating one is
+    O(1) and, because the mask is an int, it is a snapshot that stays valid while
+    the game it came from keeps changing.
+    """
+
+    __slots__ = ('geometry', 'mask')
+
+    def __init__(self, geometry, mask):
+        self.geometry = geometry
+        self.mask = mask
+
+    def __contains__(self, line):
+        i = self.geometry.line_index.get(line)
+        return i is not None and bool(self.mask >> i & 1)
+
+    def __iter__(self):
+        lines = self.geometry.lines
+        for i in iter_bits(self.mask):
+            yield lines[i]
+
+    def __len__(self):
+        return self.mask.bit_count()
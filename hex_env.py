@@ -0,0 +1,194 @@
+"""
+Gym-style environment for the hex game that needs only NumPy.
+
+Follows the Gymnasium API (reset(seed) -> (obs, info), step(action) -> (obs,
+reward, terminated, truncated, info)) without depending on gym. Actions are
+indices into the board's line catalog, geometry.lines.
+
+Observation arrays are allocated once and updated in place by each step, so copy
+them if they have to outlive the next step:
+
+    segments     (segments,) uint8  - drawn unit segments
+    triangles    (triangles,) int8  - 0 unclaimed, else the owning player
+    action_mask  (lines,) bool      - legal actions, updated as lines get blocked
+    player       (1,) int8          - player to move
+"""
+import numpy as np
+
+from geometry import get_geometry, iter_bits
+
+
+class Discrete:
+    """Action space of n integer actions, like gym.spaces.Discrete"""
+
+    def __init__(self, n, seed=None):
+        self.n = n
+        self.shape = ()
+        self.dtype = np.int64
+        self.np_random = np.random.default_rng(seed)
+
+    def seed(self, seed=None):
+        self.np_random = np.random.default_rng(seed)
+
+    def sample(self, mask=None):
+        """Returns a random action, restricted to the True entries of mask if given"""
+        if mask is None:
+            return int(self.np_random.integers(self.n))
+        return int(self.np_random.choice(np.flatnonzero(mask)))
+
+    def contains(self, action):
+        return isinstance(action, (int, np.integer)) and 0 <= action < self.n
+
+
+class Box:
+    """Bounded array space, like gym.spaces.Box (shape and bounds only)"""
+
+    def __init__(self, low, high, shape, dtype):
+        self.low = low
+        self.high = high
+        self.shape = shape
+        self.dtype = dtype
+
+    def contains(self, value):
+        value = np.asarray(value)
+        return value.shape == self.shape and bool(((value >= self.low) & (value <= self.high)).all())
+
+
+class HexEnv:
+    """
+    One game per environment. Without an opponent the caller plays both sides
+    and each reward is for the player who just moved. With an opponent, the
+    environment answers every agent move with one of its own, and rewards are
+    for agent_player: +1 for a win, -1 for a loss, 0 otherwise.
+
+    opponent is 'random' or a function (env) -> action.
+    """
+
+    metadata = {'render_modes': []}
+
+    def __init__(self, hex_size=3, opponent=None, agent_player=1, seed=None):
+        self.hex_size = hex_size
+        self.geometry = geometry = get_geometry(hex_size)
+        self.opponent = opponent
+        self.agent_player = agent_player
+        self.majority = geometry.majority
+
+        num_segments = len(geometry.segments)
+        num_triangles = len(geometry.triangles)
+        num_lines = len(geometry.lines)
+        self.action_space = Discrete(num_lines, seed)
+        self.observation_space = {
+            'segments': Box(0, 1, (num_segments,), np.uint8),
+            'triangles': Box(0, 2, (num_triangles,), np.int8),
+            'action_mask': Box(0, 1, (num_lines,), np.bool_),
+            'player': Box(1, 2, (1,), np.int8)
+        }
+
+        # Per-action index arrays, so a step touches only what the move changed: the
+        # segments the line covers, and the lines it blocks as the engine's geometry lists them
+        self._line_segments = tuple(np.array(segments, dtype=np.intp) for segments in geometry.line_segment_list)
+        self._line_blocks = tuple(np.array(list(iter_bits(blocked)), dtype=np.intp)
+                                  for blocked in geometry.line_block_masks)
+
+        # Initial state template that reset copies from
+        self._template = {
+            'segments': np.zeros(num_segments, dtype=np.uint8),
+            'triangles': np.zeros(num_triangles, dtype=np.int8),
+            'action_mask': np.ones(num_lines, dtype=np.bool_),
+            'player': np.ones(1, dtype=np.int8)
+        }
+        self.observation = {name: array.copy() for name, array in self._template.items()}
+        self._rng = np.random.default_rng(seed)
+        self._reset_state()
+
+    def _reset_state(self):
+        for name, array in self._template.items():
+            np.copyto(self.observation[name], array)
+        self.occupied = 0
+        self.owned = [0, 0, 0]  # Triangle bitmask per player, indexed by player number
+        self.current_player = 1
+        self.terminated = False
+        self.winner = None
+
+    def reset(self, seed=None, options=None):
+        if seed is not None:
+            self._rng = np.random.default_rng(seed)
+            self.action_space.seed(seed)
+        self._reset_state()
+        if self.opponent is not None and self.agent_player == 2:
+            self._apply(self._opponent_action())
+        return self.observation, self._info(True, 0)
+
+    def step(self, action):
+        """
+        Plays action. An illegal action leaves the board unchanged, like
+        HexGame.make_move, and comes back with info['valid'] False.
+        """
+        if self.terminated:
+            raise RuntimeError("step() called on a finished game; call reset() first")
+        action = int(action)
+        if not self.observation['action_mask'][action]:
+            return self.observation, 0.0, False, False, self._info(False, 0)
+
+        mover = self.current_player
+        triangles_formed = self._apply(action)
+        if self.opponent is not None and not self.terminated:
+            self._apply(self._opponent_action())
+            mover = self.agent_player
+
+        reward = 0.0
+        if self.terminated and self.winner:
+            reward = 1.0 if self.winner == mover else -1.0
+        return self.observation, reward, self.terminated, False, self._info(True, triangles_formed)
+
+    def action_masks(self):
+        """Legal-action mask, for libraries that ask for it by this name"""
+        return self.observation['action_mask']
+
+    def get_scores(self):
+        return {1: self.owned[1].bit_count(), 2: self.owned[2].bit_count()}
+
+    def _apply(self, action):
+        """Plays a legal action and returns how many triangles it claimed"""
+        geometry = self.geometry
+        observation = self.observation
+        player = self.current_player
+        occupied = self.occupied | geometry.line_mask_list[action]
+        claimed = 0
+        for s in geometry.line_segment_list[action]:
+            for bit, triangle_mask in geometry.segment_triangles[s]:
+                if occupied & triangle_mask == triangle_mask:
+                    claimed |= bit
+        observation['action_mask'][self._line_blocks[action]] = False
+        observation['segments'][self._line_segments[action]] = 1
+        if claimed:
+            observation['triangles'][list(iter_bits(claimed))] = player
+        self.occupied = occupied
+        self.owned[player] |= claimed
+        self.current_player = 3 - player
+        observation['player'][0] = self.current_player
+
+        # Same thresholds as HexGame.make_move
+        score1 = self.owned[1].bit_count()
+        score2 = self.owned[2].bit_count()
+        if score1 > self.majority or score2 > self.majority:
+            self.terminated = True
+            self.winner = player
+        elif score1 == self.majority and score2 == self.majority:
+            self.terminated = True
+            self.winner = 0
+        return claimed.bit_count()
+
+    def _opponent_action(self):
+        if self.opponent == 'random':
+            return int(self._rng.choice(np.flatnonzero(self.observation['action_mask'])))
+        return int(self.opponent(self))
+
+    def _info(self, valid, triangles_formed):
+        return {
+            'valid': valid,
+            'triangles_formed': triangles_formed,
+            'winner': self.winner,
+            'current_player': self.current_player,
+            'scores': self.get_scores()
+        }
@@ -0,0 +1,143 @@
+"""
+Optional search instrumentation for MinimaxAgent(instrument=True).
+
+Nothing here runs unless instrumentation is switched on: the agent then wraps its
+recursive search and the game it searches, counting nodes and cutoffs per ply and
+timing each game operation. With it off the search code is unchanged.
+"""
+import json
+import time
+
+# Game operations timed by InstrumentedGame
+TIMED_OPERATIONS = ('get_valid_moves', 'push_move', 'pop_move', 'make_move', 'copy', 'get_scores',
+                    'zobrist_key', 'canonical_key')
+
+
+class SearchStats:
+    """Counters for one get_move call, plus a trace of its iterative deepening steps"""
+
+    def __init__(self):
+        self.nodes = {}  # {ply: nodes visited}
+        self.cutoffs = {}  # {ply: beta cutoffs}
+        self.op_calls = {}  # {operation: calls}
+        self.op_time = {}  # {operation: seconds}
+        self.tt_probes = 0
+        self.tt_hits = 0
+        self.book_hit = False
+        self.endgame_outcome = None  # WIN, DRAW or LOSS when the endgame solver chose the move
+        self.endgame_nodes = 0
+        self.elapsed = 0.0
+        self.trace = []  # One dict per completed or abandoned search depth
+
+    def add_time(self, operation, seconds):
+        self.op_calls[operation] = self.op_calls.get(operation, 0) + 1
+        self.op_time[operation] = self.op_time.get(operation, 0.0) + seconds
+
+    def merge(self, other):
+        """Adds the counters of a search run elsewhere, such as a parallel search worker"""
+        for counts, extra in ((self.nodes, other.nodes), (self.cutoffs, other.cutoffs),
+                              (self.op_calls, other.op_calls), (self.op_time, other.op_time)):
+            for key, value in extra.items():
+                counts[key] = counts.get(key, 0) + value
+        self.tt_probes += other.tt_probes
+        self.tt_hits += other.tt_hits
+
+    def branching_factors(self):
+        """{ply: nodes at ply + 1 per node at ply}, the effective branching factor"""
+        return {ply: self.nodes.get(ply + 1, 0) / count for ply, count in sorted(self.nodes.items())
+                if count and ply + 1 in self.nodes}
+
+    def as_dict(self):
+        total_nodes = sum(self.nodes.values())
+        return {
+            'nodes': total_nodes,
+            'nodes_per_s': total_nodes / self.elapsed if self.elapsed else 0.0,
+            'elapsed': self.elapsed,
+            'nodes_by_ply': dict(sorted(self.nodes.items())),
+            'cutoffs_by_ply': dict(sorted(self.cutoffs.items())),
+            'branching_by_ply': self.branching_factors(),
+            'operations': {
+                operation: {'calls': calls, 'seconds': self.op_time[operation],
+                            'us_per_call': self.op_time[operation] / calls * 1e6}
+                for operation, calls in sorted(self.op_calls.items())
+            },
+            'tt_probes': self.tt_probes,
+            'tt_hits': self.tt_hits,
+            'tt_hit_rate': self.tt_hits / self.tt_probes if self.tt_probes else 0.0,
+            'book_hit': self.book_hit,
+            'endgame_outcome': self.endgame_outcome,
+            'endgame_nodes': self.endgame_nodes,
+            'trace': self.trace
+        }
+
+    def write_trace(self, path):
+        """Appends this move's stats as one JSON line, for offline analysis"""
+        with open(path, 'a') as f:
+            f.write(json.dumps(self.as_dict(), default=str) + '\n')
+
+
+class InstrumentedGame:
+    """Wraps a game and times the operations the search calls on it"""
+
+    def __init__(self, game, stats):
+        self._game = game
+        self._stats = stats
+        for operation in TIMED_OPERATIONS:
+            if hasattr(game, operation):
+                setattr(self, operation, self._timed(operation, getattr(game, operation)))
+
+    def __getattr__(self, name):
+        return getattr(self._game, name)
+
+    def _timed(self, operation, method):
+        stats = self._stats
+        clock = time.perf_counter
+
+        def timed(*args):
+            start = clock()
+            result = method(*args)
+            stats.add_time(operation, clock() - start)
+            return result
+        return timed
+
+
+def instrument_agent(agent, stats):
+    """
+    Shadows the agent's recursive search methods with counting wrappers for the
+    length of one search. Returns a function that removes them again.
+    """
+    negamax = agent._negamax
+    minimax = agent._minimax
+    record_cutoff = agent._record_cutoff
+    evaluate = agent._evaluate_position
+    nodes = stats.nodes
+    cutoffs = stats.cutoffs
+    clock = time.perf_counter
+
+    def counted_negamax(game, depth, alpha, beta, ply):
+        nodes[ply] = nodes.get(ply, 0) + 1
+        return negamax(game, depth, alpha, beta, ply)
+
+    def counted_minimax(game, depth, is_maximizing):
+        ply = agent.max_depth - depth
+        nodes[ply] = nodes.get(ply, 0) + 1
+        return minimax(game, depth, is_maximizing)
+
+    def counted_cutoff(move, depth, ply):
+        cutoffs[ply] = cutoffs.get(ply, 0) + 1
+        record_cutoff(move, depth, ply)
+
+    def timed_evaluate(game):
+        start = clock()
+        result = evaluate(game)
+        stats.add_time('evaluate', clock() - start)
+        return result
+
+    agent._negamax = counted_negamax
+    agent._minimax = counted_minimax
+    agent._record_cutoff = counted_cutoff
+    agent._evaluate_position = timed_evaluate
+
+    def remove():
+        del agent._negamax, agent._minimax, agent._record_cutoff, agent._evaluate_position
+    return remove
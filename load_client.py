@@ -0,0 +1,171 @@
+"""
+Load generator for server.py.
+
+Opens many concurrent connections that play random legal moves against each
+other (or against the server's AI) and reports throughput and move latency.
+Idle connections can be added to measure how many open games a server holds.
+
+    python load_client.py --games 500 --idle 2000
+"""
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+
+from bitboard_game import BitboardHexGame
+
+
+class LoadStats:
+    def __init__(self):
+        self.games_finished = 0
+        self.moves = 0
+        self.errors = 0
+        self.latencies = []
+
+
+async def _send(writer, message):
+    writer.write(json.dumps(message).encode() + b'\n')
+    await writer.drain()
+
+
+async def _join(host, port, hex_size, opponent):
+    """Opens a connection and joins a game; returns (reader, writer, reply to the join)"""
+    reader, writer = await asyncio.open_connection(host, port)
+    await _send(writer, {'type': 'join', 'opponent': opponent, 'hex_size': hex_size})
+    line = await reader.readline()
+    return reader, writer, json.loads(line) if line else {'type': 'error'}
+
+
+async def _play(reader, writer, joined, opponent, stats, rng):
+    """Plays random moves on one joined connection until its game ends"""
+    game = BitboardHexGame(joined['hex_size'])
+    seat = joined['player']
+    started = opponent == 'ai' or not joined['waiting']
+    sent_at = None
+    while True:
+        if started and seat == game.current_player and sent_at is None and not game.game_over:
+            move = rng.choice(sorted(game.get_valid_moves()))
+            sent_at = time.perf_counter()
+            await _send(writer, {'type': 'move', 'line': move})
+
+        line = await reader.readline()
+        if not line:
+            break
+        message = json.loads(line)
+        kind = message['type']
+        if kind == 'start':
+            started = True
+        elif kind == 'move':
+            (r1, c1), (r2, c2) = message['line']
+            game.make_move((r1, c1), (r2, c2))
+            if message['player'] == seat and sent_at is not None:
+                stats.latencies.append(time.perf_counter() - sent_at)
+                sent_at = None
+            if message['player'] == seat or opponent == 'ai':
+                stats.moves += 1  # Count each move once, not once per player who sees it
+            if message['game_over']:
+                if seat == 1 or opponent == 'ai':
+                    stats.games_finished += 1  # Likewise once per game, by the first seat
+                break
+        elif kind == 'opponent_left':
+            break
+        elif kind == 'error':
+            stats.errors += 1
+
+
+async def play_client(host, port, hex_size, opponent, games, stats, rng, join_lock):
+    """
+    Plays games one after another with random moves, on fresh connections each. Against
+    a human, this client plays both seats: it joins them back to back under join_lock,
+    so the server pairs them with each other and never with another client's seat.
+    """
+    for _ in range(games):
+        if opponent == 'ai':
+            connections = [await _join(host, port, hex_size, opponent)]
+        else:
+            async with join_lock:
+                connections = [await _join(host, port, hex_size, opponent)]
+                if connections[0][2]['type'] == 'joined':
+                    connections.append(await _join(host, port, hex_size, opponent))
+        try:
+            if all(joined['type'] == 'joined' for _, _, joined in connections):
+                await asyncio.gather(*(_play(reader, writer, joined, opponent, stats, rng)
+                                       for reader, writer, joined in connections))
+            else:
+                stats.errors += 1  # Server full; leave any seat already taken
+        finally:
+            for _, writer, _ in connections:
+                writer.close()
+
+
+async def idle_client(host, port, hex_size, stop):
+    """Joins a game against the AI and then waits without moving"""
+    reader, writer = await asyncio.open_connection(host, port)
+    await _send(writer, {'type': 'join', 'opponent': 'ai', 'hex_size': hex_size})
+    await reader.readline()
+    await stop.wait()
+    writer.close()
+
+
+async def run_load(host, port, games, concurrency, idle, hex_size, opponent, seed):
+    stats = LoadStats()
+    stop = asyncio.Event()
+    idlers = [asyncio.create_task(idle_client(host, port, hex_size, stop)) for _ in range(idle)]
+    await asyncio.sleep(0)
+
+    rng = random.Random(seed)
+    # Against a human each client holds two connections, one per seat
+    clients = max(1, concurrency // 2 if opponent == 'human' else concurrency)
+    join_lock = asyncio.Lock()
+    start = time.perf_counter()
+    await asyncio.gather(*(play_client(host, port, hex_size, opponent, games // clients + (i < games % clients),
+                                       stats, random.Random(rng.random()), join_lock) for i in range(clients)))
+    elapsed = time.perf_counter() - start
+
+    # Ask the server how many games it holds while the idle clients are still connected
+    reader, writer = await asyncio.open_connection(host, port)
+    await _send(writer, {'type': 'stats'})
+    server_stats = json.loads(await reader.readline())
+    writer.close()
+    stop.set()
+    await asyncio.gather(*idlers, return_exceptions=True)
+
+    latencies = sorted(stats.latencies)
+    report = {
+        'elapsed': elapsed,
+        'games_finished': stats.games_finished,
+        'moves': stats.moves,
+        'moves_per_s': stats.moves / elapsed if elapsed else 0.0,
+        'errors': stats.errors,
+        'server': server_stats
+    }
+    if latencies:
+        report['latency_ms'] = {
+            'mean': statistics.fmean(latencies) * 1e3,
+            'p50': latencies[len(latencies) // 2] * 1e3,
+            'p99': latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1e3
+        }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate load against a running server.py")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--games', type=int, default=200, help="Games to play in total")
+    parser.add_argument('--concurrency', type=int, default=50, help="Connections playing at once")
+    parser.add_argument('--idle', type=int, default=0, help="Extra connections that join a game and wait")
+    parser.add_argument('--hex-size', type=int, default=3)
+    parser.add_argument('--opponent', choices=('human', 'ai'), default='human')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    report = asyncio.run(run_load(args.host, args.port, args.games, args.concurrency, args.idle,
+                                  args.hex_size, args.opponent, args.seed))
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,282 @@
+import math
+import random
+import time
+
+from endgame import EndgameSolver
+
+PLAYOUT_POLICIES = ('random', 'greedy')
+
+# Caps the tree built while pondering, so a long think by the opponent cannot exhaust memory
+PONDER_ITERATIONS = 500_000
+
+
+class MCTSNode:
+    __slots__ = ('move', 'parent', 'children', 'untried', 'visits', 'wins', 'player')
+
+    def __init__(self, move, parent, untried, player):
+        self.move = move  # Line index that led here, None at the root
+        self.parent = parent
+        self.children = []
+        self.untried = untried  # Line indices not expanded yet, None until the node is revisited
+        self.visits = 0
+        self.wins = 0.0  # From the perspective of the player who made self.move
+        self.player = player  # Player who made self.move
+
+
+class MCTSAgent:
+    """
+    Monte Carlo Tree Search agent with the same get_move(game) interface as MinimaxAgent.
+
+    Runs UCT over line indices of the game's BoardGeometry. The tree and playouts
+    use plain integer state (occupied-segment mask, scores, side to move) instead
+    of HexGame objects, and the subtree under the moves actually played is kept
+    for the next call. With endgame=N, positions with at most N legal moves left
+    are solved exactly by endgame.EndgameSolver instead.
+    """
+
+    def __init__(self, player_number, max_iterations=None, time_limit=1.0, exploration=1.4,
+                 playout='random', reuse_tree=True, seed=None, endgame=None):
+        if playout not in PLAYOUT_POLICIES:
+            raise ValueError(f"Unknown playout policy {playout!r}, expected one of {PLAYOUT_POLICIES}")
+        if max_iterations is None and time_limit is None:
+            raise ValueError("MCTSAgent needs max_iterations or time_limit")
+        self.player_number = player_number
+        self.max_iterations = max_iterations
+        self.time_limit = time_limit  # Seconds per move
+        self.exploration = exploration
+        self.playout = playout
+        self.reuse_tree = reuse_tree
+        self.rng = random.Random(seed)
+        self.endgame = None if not endgame else EndgameSolver(endgame)
+
+        # Results of the last search
+        self.playouts = 0
+        self.elapsed = 0.0
+        self.current_best = None  # Most visited move so far, readable while a search runs in another thread
+
+        self._root = None
+        self._root_history = None
+        self._geometry = None
+
+    def get_move(self, game, stop_event=None):
+        """
+        Returns the most visited move after searching the current position. Setting
+        stop_event (a threading.Event) from another thread ends the search early.
+        """
+        if self.endgame is not None:
+            solved = self.endgame.solve(game)
+            if solved is not None:
+                self.current_best = solved[1]
+                return solved[1]
+        return self._search(game, stop_event, self.max_iterations, self.time_limit)
+
+    def ponder(self, game, stop_event):
+        """
+        Grows the tree for the opponent's position until stop_event is set. The
+        subtree under the opponent's actual move is reused by the next get_move.
+        """
+        self._search(game, stop_event, PONDER_ITERATIONS, None)
+
+    def _search(self, game, stop_event, max_iterations, time_limit):
+        self.current_best = None
+        geometry = game.geometry
+        history = [geometry.line_index[line] for line in game.get_move_history()]
+        root_state = self._replay(geometry, history)
+        if root_state[4]:
+            return None
+
+        root = self._find_root(geometry, history, root_state)
+        if not root.untried and not root.children:
+            return None
+
+        start = time.perf_counter()
+        deadline = None if time_limit is None else start + time_limit
+        iterations = 0
+        while max_iterations is None or iterations < max_iterations:
+            if deadline is not None and time.perf_counter() >= deadline:
+                break
+            if stop_event is not None and stop_event.is_set():
+                break
+            self._iterate(root, root_state)
+            iterations += 1
+            if iterations & 511 == 0:
+                self.current_best = geometry.lines[max(root.children, key=lambda child: child.visits).move]
+        self.playouts = iterations
+        self.elapsed = time.perf_counter() - start
+
+        if not root.children:
+            return geometry.lines[self.rng.choice(root.untried)]
+        best = max(root.children, key=lambda child: child.visits)
+        return geometry.lines[best.move]
+
+    def _find_root(self, geometry, history, root_state):
+        """Reuses the subtree reached by the moves played since the last search, if any"""
+        root = None
+        if self.reuse_tree and self._root is not None and self._geometry is geometry:
+            previous = self._root_history
+            if history[:len(previous)] == previous:
+                root = self._root
+                for move in history[len(previous):]:
+                    root = next((child for child in root.children if child.move == move), None)
+                    if root is None:
+                        break
+        if root is None:
+            root = MCTSNode(None, None, self._legal_lines(geometry, root_state[0]), 3 - root_state[3])
+        if root.untried is None:
+            root.untried = self._legal_lines(geometry, root_state[0])
+        root.parent = None  # Let the rest of the old tree be collected
+        self._root = root
+        self._root_history = history
+        self._geometry = geometry
+        return root
+
+    def _iterate(self, root, root_state):
+        geometry = self._geometry
+        occupied, score1, score2, player, game_over, winner = root_state
+        node = root
+
+        # Selection
+        sqrt = math.sqrt
+        while True:
+            if node.untried is None:
+                node.untried = [] if game_over else self._legal_lines(geometry, occupied)
+            if node.untried or not node.children or game_over:
+                break
+            scale = self.exploration * sqrt(math.log(node.visits))
+            best_value = -1.0
+            for child in node.children:
+                visits = child.visits
+                value = child.wins / visits + scale / sqrt(visits)
+                if value > best_value:
+                    best_value, best = value, child
+            node = best
+            occupied, score1, score2, player, game_over, winner = self._apply(
+                geometry, occupied, score1, score2, player, node.move)
+
+        # Expansion
+        if node.untried and not game_over:
+            untried = node.untried
+            i = self.rng.randrange(len(untried))
+            untried[i], untried[-1] = untried[-1], untried[i]
+            move = untried.pop()
+            occupied, score1, score2, player, game_over, winner = self._apply(
+                geometry, occupied, score1, score2, player, move)
+            child = MCTSNode(move, node, None, 3 - player)
+            node.children.append(child)
+            node = child
+
+        # Simulation
+        if not game_over:
+            winner = self._simulate(geometry, occupied, score1, score2, player)
+
+        # Backpropagation
+        while node is not None:
+            node.visits += 1
+            if winner == node.player:
+                node.wins += 1.0
+            elif winner == 0:
+                node.wins += 0.5
+            node = node.parent
+
+    def _simulate(self, geometry, occupied, score1, score2, player):
+        """Plays uniformly random (or capture-first) legal lines to the end, returns the winner"""
+        line_masks = geometry.line_mask_list
+        line_triangles = geometry.line_triangle_list
+        unit_lines = geometry.segment_unit_lines
+        majority = geometry.majority
+        draw_score = geometry.draw_score
+        greedy = self.playout == 'greedy'
+
+        # Unit lines that would complete a triangle; entries may have gone stale
+        captures = self._captures(geometry, occupied) if greedy else None
+
+        # Draw uniformly from a candidate list that is a superset of the legal lines,
+        # dropping each drawn line; blocked lines are discarded as they are found,
+        # so the legal set is never rebuilt and each playout costs O(lines)
+        rand = self.rng.random
+        candidates = list(range(len(line_masks)))
+        while True:
+            move = None
+            while captures:
+                move = captures.pop()
+                if not line_masks[move] & occupied:
+                    break
+                move = None
+            if move is None:
+                while True:
+                    if not candidates:
+                        # Out of lines before anyone reached the target: the higher score wins
+                        return 1 if score1 > score2 else 2 if score2 > score1 else 0
+                    i = int(rand() * len(candidates))
+                    move = candidates[i]
+                    last = candidates.pop()
+                    if i < len(candidates):
+                        candidates[i] = last
+                    if not line_masks[move] & occupied:
+                        break
+
+            occupied |= line_masks[move]
+            claimed = 0
+            for weight, triangle_mask in line_triangles[move]:
+                missing = triangle_mask & ~occupied
+                if not missing:
+                    claimed += weight
+                elif greedy and not missing & (missing - 1):
+                    line = unit_lines[missing.bit_length() - 1]
+                    if line is not None:
+                        captures.append(line)
+            if player == 1:
+                score1 += claimed
+            else:
+                score2 += claimed
+
+            if score1 > majority:
+                return 1
+            if score2 > majority:
+                return 2
+            if score1 == draw_score and score2 == draw_score:
+                return 0
+            player = 3 - player
+
+    @staticmethod
+    def _captures(geometry, occupied):
+        """Returns the unit lines of segments that each complete a triangle"""
+        captures = []
+        for triangle_mask in geometry.triangle_masks:
+            missing = triangle_mask & ~occupied
+            if missing and not missing & (missing - 1):
+                line = geometry.segment_unit_lines[missing.bit_length() - 1]
+                if line is not None:
+                    captures.append(line)
+        return captures
+
+    @staticmethod
+    def _apply(geometry, occupied, score1, score2, player, move):
+        """Returns the state after player draws line index move"""
+        occupied |= geometry.line_mask_list[move]
+        claimed = 0
+        for weight, triangle_mask in geometry.line_triangle_list[move]:
+            if occupied & triangle_mask == triangle_mask:
+                claimed += weight
+        if player == 1:
+            score1 += claimed
+        else:
+            score2 += claimed
+
+        majority = geometry.majority
+        game_over, winner = False, None
+        if score1 > majority or score2 > majority:
+            game_over, winner = True, player
+        if score1 == geometry.draw_score and score2 == geometry.draw_score:
+            game_over, winner = True, 0
+        return occupied, score1, score2, 3 - player, game_over, winner
+
+    def _replay(self, geometry, history):
+        state = (0, 0, 0, 1, False, None)
+        for move in history:
+            state = self._apply(geometry, *state[:4], move)
+        return state
+
+    @staticmethod
+    def _legal_lines(geometry, occupied):
+        return [i for i, mask in enumerate(geometry.line_mask_list) if not mask & occupied]
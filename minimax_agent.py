@@ -1,40 +1,211 @@
+from endgame import EndgameSolver
+from evaluation import capture_gains, evaluate_threats
 from game import HexGame
+from instrumentation import InstrumentedGame, SearchStats, instrument_agent
+from transposition import EXACT, LOWER, UPPER, TranspositionTable
 import random
+import time
+
+SEARCH_MODES = ('minimax', 'alphabeta')
+EVALUATIONS = ('score', 'threats')
+
+# Plies from the root at which symmetric moves are merged when symmetry=True
+SYMMETRY_PLIES = 4
+
+# Score of a won position, far above any triangle difference; wins found sooner score higher
+WIN_SCORE = 10000
+
+
+class SearchTimeout(Exception):
+    """Raised inside the search once the per-move time or node budget is spent"""
+
+
 class MinimaxAgent:
-    def __init__(self, player_number):
+    def __init__(self, player_number, max_depth=2, search='minimax', time_limit=None, node_limit=None,
+                 tt_size_bits=None, symmetry=False, seed=None, book=None, workers=None,
+                 instrument=False, trace_path=None, evaluation='score', quiescence=0, endgame=None):
+        """
+        search is 'minimax' or 'alphabeta'. With a time_limit (seconds) or node_limit
+        per move, the agent deepens iteratively up to max_depth (None for no limit)
+        and plays the best move of the last depth it completed. Without a budget,
+        'minimax' keeps the original fixed-depth search.
+
+        tt_size_bits enables a transposition table with 2**tt_size_bits slots for
+        the iterative deepening search. With symmetry=True, rotated and mirrored
+        positions share one table entry, and of the moves that are mirror images
+        of each other in a symmetric position only one is searched.
+
+        seed makes the random tie-breaks between equally scored moves reproducible.
+
+        book is an OpeningBook or the path of a book file; positions found in it
+        are played instantly without searching.
+
+        workers > 1 splits the root moves of each depth over a pool of that many
+        processes, kept for the agent's lifetime (call close() to end it). Seeded
+        parallel searches pick the same move however the workers are scheduled.
+
+        instrument=True collects a SearchStats for every get_move call in self.stats:
+        nodes and cutoffs per ply, time per game operation, table hits and a trace of
+        each deepening step. trace_path appends each move's stats to a JSON lines
+        file. Off by default, when the search runs without any of it.
+
+        evaluation='threats' scores leaves with evaluation.evaluate_threats, which
+        also sees captures one move away. quiescence > 0 keeps searching only
+        triangle-capturing moves, up to that many plies, past the depth limit.
+
+        endgame=N plays positions with at most N legal moves left by solving them
+        exactly with endgame.EndgameSolver, whose results carry over between moves.
+        """
+        if search not in SEARCH_MODES:
+            raise ValueError(f"Unknown search mode {search!r}, expected one of {SEARCH_MODES}")
+        if evaluation not in EVALUATIONS:
+            raise ValueError(f"Unknown evaluation {evaluation!r}, expected one of {EVALUATIONS}")
+        if max_depth is None and time_limit is None and node_limit is None:
+            raise ValueError("max_depth=None needs a time_limit or node_limit")
         self.player_number = player_number
-        self.max_depth = 2  # Adjust this based on performance needs
+        self.max_depth = max_depth  # Adjust this based on performance needs
+        self.search = search
+        self.time_limit = time_limit
+        self.node_limit = node_limit
+        self.symmetry = symmetry
+        self.evaluation = evaluation
+        self.quiescence = quiescence
+        self.seed = seed
+        self.rng = random.Random(seed)
+        if isinstance(book, str):
+            from opening_book import OpeningBook
+            book = OpeningBook(book)
+        self.book = book
+        self.tt_size_bits = tt_size_bits
+        self.transposition_table = None if tt_size_bits is None else TranspositionTable(tt_size_bits)
+        self.workers = workers
+        self._parallel = None  # RootParallelSearch, started on the first search that needs it
+        self.instrument = instrument or trace_path is not None
+        self.trace_path = trace_path
+        self.stats = None  # SearchStats of the last instrumented move
+        self.endgame = None if not endgame else EndgameSolver(endgame)
+
+        # Results of the last iterative deepening search
+        self.nodes = 0
+        self.completed_depth = 0
+        self.best_score = None
+        self.current_best = None  # Best move found so far, readable while a search runs in another thread
 
-    def get_move(self, game):
+        self._deadline = None
+        self._stop_event = None
+        self._pv = []  # Principal variation of the last completed depth
+        self._killers = {}  # {ply: [move, ...]} moves that caused a cutoff at that ply
+        self._history = {}  # {move: weight} accumulated over cutoffs
+        self._hit_horizon = False
+        self._pondering = False  # Set while ponder searches, which is never traced
+
+    def get_move(self, game, stop_event=None):
+        """
+        Returns the best move according to the configured search. Setting stop_event
+        (a threading.Event) from another thread ends the search early with the best
+        move found so far.
+        """
+        self._stop_event = stop_event
+        self.current_best = None
+        if self.instrument:
+            return self._get_move_instrumented(game)
+        return self._choose_move(game)
+
+    def _choose_move(self, game):
+        if self.book is not None:
+            entry = self.book.lookup(game)
+            if entry is not None and game.is_valid_connection(*entry[0]):
+                self.current_best = entry[0]
+                if self.stats is not None:
+                    self.stats.book_hit = True
+                return entry[0]
+        if self.endgame is not None:
+            solved = self.endgame.solve(game)
+            if solved is not None:
+                self.current_best = solved[1]
+                if self.stats is not None:
+                    self.stats.endgame_outcome, self.stats.endgame_nodes = solved[0], self.endgame.nodes
+                return solved[1]
+        if (self.search == 'minimax' and self.time_limit is None and self.node_limit is None
+                and self.transposition_table is None and not (self.workers or 0) > 1):
+            return self._get_minimax_move(game)
+        return self._iterative_deepening(game)
+
+    def _get_move_instrumented(self, game):
+        stats = self.stats = SearchStats()
+        tt = self.transposition_table
+        probes, hits = (tt.probes, tt.hits) if tt is not None else (0, 0)
+        remove = instrument_agent(self, stats)
+        start = time.perf_counter()
+        try:
+            move = self._choose_move(InstrumentedGame(game, stats))
+        finally:
+            remove()
+        stats.elapsed = time.perf_counter() - start
+        if tt is not None:
+            # Parallel workers add the probes of their own tables
+            stats.tt_probes += tt.probes - probes
+            stats.tt_hits += tt.hits - hits
+        if self.trace_path is not None:
+            stats.write_trace(self.trace_path)
+        return move
+
+    def ponder(self, game, stop_event):
+        """
+        Searches the opponent's position until stop_event is set, one ply deeper than
+        a normal move, so the transposition table already holds the positions this
+        agent will face after the opponent moves. Does nothing without a table.
+        """
+        if self.transposition_table is None:
+            return
+        self._stop_event = stop_event
+        budget = (self.max_depth, self.time_limit, self.node_limit)
+        self.max_depth = None if self.max_depth is None else self.max_depth + 1
+        self.time_limit = self.node_limit = None
+        # Pondering must not change the moves a seeded agent plays, so its tie-break
+        # shuffle draws from the rng without advancing it
+        rng_state = self.rng.getstate()
+        self._pondering = True
+        try:
+            self._iterative_deepening(game)
+        finally:
+            self.max_depth, self.time_limit, self.node_limit = budget
+            self.rng.setstate(rng_state)
+            self._pondering = False
+
+    def close(self):
+        """Shuts down the worker pool of a parallel agent"""
+        if self._parallel is not None:
+            self._parallel.close()
+            self._parallel = None
+
+    def _get_minimax_move(self, game):
         """Returns the best move according to the minimax algorithm"""
         best_score = float('-inf')
         best_move = None
 
-        valid_moves = game.get_valid_moves()
+        valid_moves = self._candidate_moves(game, 0)
         #print(f"Valid moves: {valid_moves}")
 
-        for move in valid_moves:
-            # Create a copy of the game state
-            game_copy = game.copy()
-
-            point1, point2 = move
-            # Make the move
-            result = game_copy.make_move(point1, point2)
-
-            if result['valid']:
-
-                score = self._minimax(game_copy, self.max_depth - 1, False)
+        for move in list(valid_moves):
+            if self._stop_event is not None and self._stop_event.is_set():
+                break
+            # Search on the game itself, undoing each move afterwards instead of copying
+            if game.push_move(*move):
+                score = self._minimax(game, self.max_depth - 1, False)
+                game.pop_move()
 
                 if score > best_score:
                     best_score = score
                     best_move = move
 
                 if score == best_score:
-                    if random.choice([True, False]):
+                    if self.rng.choice([True, False]):
                         best_move = move
+                self.current_best = best_move
 
         if(best_move is None and len(valid_moves) > 0):
-            best_move = random.choice(list(valid_moves))
+            best_move = self.rng.choice(list(valid_moves))
 
         #print(f"Best move: {best_move} with score: {best_score}")
         return best_move
@@ -57,24 +228,18 @@ class MinimaxAgent:
 
         if is_maximizing:
             max_eval = float('-inf')
-            for move in valid_moves:
-                game_copy = game.copy()
-                point1, point2 = move
-                result = game_copy.make_move(point1, point2)
-
-                if result['valid']:
-                    eval = self._minimax(game_copy, depth - 1, False)
+            for move in list(valid_moves):
+                if game.push_move(*move):
+                    eval = self._minimax(game, depth - 1, False)
+                    game.pop_move()
                     max_eval = max(max_eval, eval)
             return max_eval
         else:
             min_eval = float('inf')
-            for move in valid_moves:
-                game_copy = game.copy()
-                point1, point2 = move
-                result = game_copy.make_move(point1, point2)
-
-                if result['valid']:
-                    eval = self._minimax(game_copy, depth - 1, True)
+            for move in list(valid_moves):
+                if game.push_move(*move):
+                    eval = self._minimax(game, depth - 1, True)
+                    game.pop_move()
                     min_eval = min(min_eval, eval)
             return min_eval
 
@@ -88,6 +253,275 @@ class MinimaxAgent:
             return float('inf')
         elif game.winner == 3 - self.player_number:
             return float('-inf')
+        elif self.evaluation == 'threats':
+            value = evaluate_threats(game)
+            return value if game.current_player == self.player_number else -value
         else:
             # Heuristic: difference in scores
             return scores[self.player_number] - scores[3 - self.player_number]
+
+    def _iterative_deepening(self, game):
+        """
+        Searches depth 1, 2, ... until max_depth or the budget runs out and returns
+        the best move of the last fully completed depth.
+        """
+        self.nodes = 0
+        self.completed_depth = 0
+        self.best_score = None
+        self._deadline = None if self.time_limit is None else time.perf_counter() + self.time_limit
+        self._pv = []
+        self._killers = {}
+        self._history = {}
+        if self.transposition_table is not None:
+            self.transposition_table.new_search()
+
+        root_moves = list(self._candidate_moves(game, 0))
+        if not root_moves:
+            return None
+        start = time.perf_counter()
+        self.rng.shuffle(root_moves)  # Random tie-break between equally scored moves
+        best_move = root_moves[0]
+
+        depth = 1
+        while self.max_depth is None or depth <= self.max_depth:
+            self._hit_horizon = False
+            try:
+                score, pv = self._search_root(game, root_moves, depth)
+            except SearchTimeout:
+                if self.instrument:
+                    self._trace_depth(depth, None, None, start, completed=False)
+                break
+            if self.instrument:
+                self._trace_depth(depth, score, pv, start, completed=True)
+            best_move = pv[0]
+            self.current_best = best_move
+            self.best_score = score
+            self.completed_depth = depth
+            self._pv = pv
+
+            # Try the previous best move first at the next depth
+            root_moves.remove(best_move)
+            root_moves.insert(0, best_move)
+
+            # Stop once the result is proven or searching deeper cannot change anything
+            if abs(score) > WIN_SCORE // 2 or not self._hit_horizon:
+                break
+            depth += 1
+
+        return best_move
+
+    def _trace_depth(self, depth, score, pv, start, completed):
+        if self.stats is None or self._pondering:
+            return  # Only get_move is traced
+        self.stats.trace.append({
+            'depth': depth,
+            'completed': completed,
+            'score': score,
+            'pv': pv,
+            'nodes': self.nodes,
+            'elapsed': time.perf_counter() - start
+        })
+
+    def _search_root(self, game, root_moves, depth):
+        if self.workers is not None and self.workers > 1:
+            if self._parallel is None:
+                from parallel_search import RootParallelSearch
+                self._parallel = RootParallelSearch(self.workers)
+            return self._parallel.search_root(self, game, root_moves, depth)
+        alpha, beta = -WIN_SCORE - 1, WIN_SCORE + 1
+        best_score = -WIN_SCORE - 1
+        best_pv = None
+        for move in root_moves:
+            if not game.push_move(*move):
+                continue
+            try:
+                score, pv = self._negamax(game, depth - 1, -beta, -alpha, 1)
+            finally:
+                game.pop_move()
+            score = -score
+            if score > best_score:
+                best_score = score
+                best_pv = [move] + pv
+                if self.search == 'alphabeta':
+                    alpha = max(alpha, score)
+        return best_score, best_pv
+
+    def _negamax(self, game, depth, alpha, beta, ply):
+        """
+        Negamax search scored from the perspective of the player to move, with
+        alpha-beta cutoffs when search is 'alphabeta'. Returns (score, pv).
+        """
+        self.nodes += 1
+        if self._deadline is not None or self.node_limit is not None or self._stop_event is not None:
+            self._check_budget()
+
+        if game.game_over:
+            return self._terminal_score(game, ply), []
+        if depth == 0:
+            self._hit_horizon = True
+            if self.quiescence:
+                return self._quiesce(game, alpha, beta, ply, self.quiescence), []
+            if self.evaluation == 'threats':
+                return evaluate_threats(game), []
+            scores = game.get_scores()
+            return scores[game.current_player] - scores[3 - game.current_player], []
+
+        pruning = self.search == 'alphabeta'
+        tt = self.transposition_table
+        tt_move = None
+        if tt is not None:
+            key, symmetry = game.canonical_key() if self.symmetry else (game.zobrist_key(), 0)
+            entry = tt.probe(key)
+            if entry is not None:
+                entry_depth, bound, score, move_index = entry
+                score = _score_from_tt(score, ply)
+                if move_index is not None:
+                    geometry = game.geometry
+                    tt_move = geometry.lines[geometry.line_perms[geometry.symmetry_inverse[symmetry]][move_index]]
+                if entry_depth >= depth and (bound == EXACT or (bound == LOWER and score >= beta)
+                                             or (bound == UPPER and score <= alpha)):
+                    self._hit_horizon = True  # The stored result may have been cut off by depth
+                    return score, [tt_move] if tt_move is not None else []
+        alpha_start = alpha
+
+        best_score = -WIN_SCORE - 1
+        best_pv = []
+        for move in self._order_moves(self._candidate_moves(game, ply), ply, tt_move):
+            if not game.push_move(*move):
+                continue
+            try:
+                score, pv = self._negamax(game, depth - 1, -beta, -alpha, ply + 1)
+            finally:
+                game.pop_move()
+            score = -score
+
+            if score > best_score:
+                best_score = score
+                best_pv = [move] + pv
+            if pruning:
+                if score > alpha:
+                    alpha = score
+                if alpha >= beta:
+                    self._record_cutoff(move, depth, ply)
+                    break
+
+        if tt is not None and best_pv:
+            if best_score <= alpha_start:
+                bound = UPPER
+            elif best_score >= beta:
+                bound = LOWER
+            else:
+                bound = EXACT
+            geometry = game.geometry
+            move_index = geometry.line_perms[symmetry][geometry.line_index[best_pv[0]]]
+            tt.store(key, depth, bound, _score_to_tt(best_score, ply), move_index)
+        return best_score, best_pv
+
+    def _quiesce(self, game, alpha, beta, ply, depth):
+        """
+        Extends a leaf with triangle-capturing moves only, biggest captures first,
+        until the position is quiet or depth runs out. The side to move may also
+        decline to capture and keep the static evaluation.
+        """
+        if game.game_over:
+            return self._terminal_score(game, ply)
+        gains = capture_gains(game) if game.threats else {}
+        if self.evaluation == 'threats':
+            stand_pat = evaluate_threats(game, gains)
+        else:
+            scores = game.get_scores()
+            stand_pat = scores[game.current_player] - scores[3 - game.current_player]
+        if depth == 0 or not gains or stand_pat >= beta:
+            return stand_pat
+        alpha = max(alpha, stand_pat)
+
+        best_score = stand_pat
+        lines = game.geometry.lines
+        for line in sorted(gains, key=gains.get, reverse=True):
+            self.nodes += 1
+            if self._deadline is not None or self.node_limit is not None or self._stop_event is not None:
+                self._check_budget()
+            game.push_move(*lines[line])
+            try:
+                score = -self._quiesce(game, -beta, -alpha, ply + 1, depth - 1)
+            finally:
+                game.pop_move()
+            if score > best_score:
+                best_score = score
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        break
+        return best_score
+
+    def _candidate_moves(self, game, ply):
+        """
+        Valid moves to search. With symmetry on, positions near the root that some
+        rotation or reflection maps onto itself get one move per orbit; deeper
+        down they are rare enough that checking would cost more than it saves.
+        """
+        if self.symmetry and ply < SYMMETRY_PLIES:
+            return game.get_unique_moves()
+        return game.get_valid_moves()
+
+    def _terminal_score(self, game, ply):
+        """Scores a finished game for the player to move"""
+        if game.winner == game.current_player:
+            return WIN_SCORE - ply
+        elif game.winner == 3 - game.current_player:
+            return -(WIN_SCORE - ply)
+        return 0
+
+    def _order_moves(self, moves, ply, tt_move=None):
+        """
+        Yields moves by transposition table move, principal variation, killer moves,
+        then history weight. The rest are only sorted once the first ones fail to
+        cut off, which on big boards saves sorting thousands of moves per node.
+        """
+        front = list(self._killers.get(ply, ()))
+        if ply < len(self._pv):
+            front.insert(0, self._pv[ply])
+        if tt_move is not None:
+            front.insert(0, tt_move)
+        tried = []
+        for move in front:
+            if move not in tried and move in moves:
+                tried.append(move)
+                yield move
+        history = self._history
+        for move in sorted(moves, key=lambda move: history.get(move, 0), reverse=True):
+            if move not in tried:
+                yield move
+
+    def _record_cutoff(self, move, depth, ply):
+        killers = self._killers.setdefault(ply, [])
+        if move not in killers:
+            killers.insert(0, move)
+            del killers[2:]
+        self._history[move] = self._history.get(move, 0) + depth * depth
+
+    def _check_budget(self):
+        if self.node_limit is not None and self.nodes >= self.node_limit:
+            raise SearchTimeout()
+        if self.nodes & 255 == 0:
+            if self._deadline is not None and time.perf_counter() >= self._deadline:
+                raise SearchTimeout()
+            if self._stop_event is not None and self._stop_event.is_set():
+                raise SearchTimeout()
+
+
+def _score_to_tt(score, ply):
+    """Stores win scores as distance from this node rather than from the root"""
+    if score > WIN_SCORE // 2:
+        return score + ply
+    if score < -WIN_SCORE // 2:
+        return score - ply
+    return score
+
+
+def _score_from_tt(score, ply):
+    if score > WIN_SCORE // 2:
+        return score - ply
+    if score < -WIN_SCORE // 2:
+        return score + ply
+    return score
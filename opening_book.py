@@ -0,0 +1,166 @@
+"""
+Opening book: best moves and search values for early positions, stored in a
+compact sorted binary file that agents read through mmap.
+
+Positions are keyed by the canonical Zobrist hash, so all rotations and mirror
+images of a position share one record. Build a book offline with
+
+    python opening_book.py --plies 2 --depth 4 --output book_3.bin
+
+and pass the file to MinimaxAgent(book='book_3.bin').
+"""
+import argparse
+import mmap
+import multiprocessing
+import os
+import struct
+
+from bitboard_game import BitboardHexGame
+from minimax_agent import WIN_SCORE, MinimaxAgent
+
+MAGIC = b'TRGLBOOK'
+VERSION = 1
+HEADER = struct.Struct('<8sHHIQ')  # magic, version, hex_size, reserved, record count
+RECORD = struct.Struct('<QHhBBxx')  # key, move (canonical line index), value, depth, flags
+
+# Record flags
+SOLVED = 1  # value is a proven win/loss, not just a depth-limited score
+
+
+class OpeningBook:
+    """
+    Read-only view of a book file. The file is memory-mapped and binary-searched,
+    so lookups touch a few pages and processes opening the same book share them.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.hex_size, _, self.count = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} opening book")
+        if len(self._map) != HEADER.size + self.count * RECORD.size:
+            raise ValueError(f"{path} is truncated")
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+    def __len__(self):
+        return self.count
+
+    def _find(self, key):
+        """Binary search for key; returns (move, value, depth, flags) or None"""
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            record_key = struct.unpack_from('<Q', self._map, HEADER.size + middle * RECORD.size)[0]
+            if record_key < key:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self.count:
+            record = RECORD.unpack_from(self._map, HEADER.size + low * RECORD.size)
+            if record[0] == key:
+                return record[1:]
+        return None
+
+    def lookup(self, game):
+        """
+        Returns (move, value, depth, solved) for the game's position, with move in
+        the game's own coordinates and value from the side to move, or None.
+        """
+        if game.hex_size != self.hex_size or getattr(game, 'rules', None) is not None:
+            return None  # Books are built for the standard rules
+        key, symmetry = game.canonical_key()
+        record = self._find(key)
+        if record is None:
+            return None
+        move_index, value, depth, flags = record
+        geometry = game.geometry
+        move = geometry.lines[geometry.line_perms[geometry.symmetry_inverse[symmetry]][move_index]]
+        return move, value, depth, bool(flags & SOLVED)
+
+
+def write_book(path, hex_size, records):
+    """Writes {key: (move_index, value, depth, flags)} as a sorted book file"""
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, hex_size, 0, len(records)))
+        for key in sorted(records):
+            move_index, value, depth, flags = records[key]
+            f.write(RECORD.pack(key, move_index, value, depth, flags))
+    os.replace(tmp_path, path)
+
+
+def enumerate_positions(hex_size, plies):
+    """
+    Returns {canonical key: move sequence} for every position reachable in at
+    most plies moves, keeping one representative per symmetry class.
+    """
+    game = BitboardHexGame(hex_size)
+    positions = {}
+
+    def visit(depth):
+        key, _ = game.canonical_key()
+        if key in positions or game.game_over:
+            return
+        positions[key] = game.get_move_history()
+        if depth == plies:
+            return
+        for move in list(game.get_valid_moves()):
+            game.push_move(*move)
+            visit(depth + 1)
+            game.pop_move()
+
+    visit(0)
+    return positions
+
+
+def analyse_position(task):
+    """Searches one position; runs in a worker process"""
+    hex_size, moves, depth, time_limit = task
+    game = BitboardHexGame(hex_size)
+    for move in moves:
+        game.make_move(*move)
+    agent = MinimaxAgent(game.current_player, max_depth=depth, search='alphabeta',
+                         time_limit=time_limit, tt_size_bits=18, seed=0)
+    move = agent.get_move(game)
+    if agent.completed_depth == 0:
+        # The time limit ran out before depth 1; a depth 1 search is cheap and still gives a value
+        agent = MinimaxAgent(game.current_player, max_depth=1, search='alphabeta', tt_size_bits=18, seed=0)
+        move = agent.get_move(game)
+    key, symmetry = game.canonical_key()
+    geometry = game.geometry
+    move_index = geometry.line_perms[symmetry][geometry.line_index[move]]
+    solved = abs(agent.best_score) > WIN_SCORE // 2
+    value = max(-32767, min(32767, agent.best_score))
+    return key, (move_index, value, agent.completed_depth, SOLVED if solved else 0)
+
+
+def build_book(path, hex_size=3, plies=2, depth=4, time_limit=None, workers=None):
+    positions = enumerate_positions(hex_size, plies)
+    tasks = [(hex_size, moves, depth, time_limit) for moves in positions.values()]
+    with multiprocessing.Pool(workers or os.cpu_count()) as pool:
+        records = dict(pool.imap_unordered(analyse_position, tasks, chunksize=4))
+    write_book(path, hex_size, records)
+    return len(records)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build an opening book for MinimaxAgent")
+    parser.add_argument('--hex-size', type=int, default=3)
+    parser.add_argument('--plies', type=int, default=2, help="Cover positions up to this many moves in")
+    parser.add_argument('--depth', type=int, default=4, help="Search depth per position")
+    parser.add_argument('--time-limit', type=float, default=None, help="Optional seconds per position")
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--output', default='opening_book.bin')
+    args = parser.parse_args()
+
+    count = build_book(args.output, args.hex_size, args.plies, args.depth, args.time_limit, args.workers)
+    print(f"Wrote {count} positions to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
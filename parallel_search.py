@@ -0,0 +1,241 @@
+"""
+Root-parallel search for MinimaxAgent(workers=N).
+
+The root moves of each iterative deepening depth are split over a persistent
+process pool. The first (principal variation) move is searched alone, then the
+rest in parallel, young-brothers-wait style. Finished workers publish their
+score through a shared value, and each new root move is searched against the
+best score so far instead of a full window.
+
+Workers receive the position as the board size plus the move history packed as
+line indices, and replay it on a BitboardHexGame. A node_limit is shared: workers
+lease nodes from one counter in small chunks, so all of them together search no
+more nodes than the serial search would.
+"""
+import array
+import functools
+import multiprocessing
+import time
+
+from bitboard_game import BitboardHexGame
+from instrumentation import InstrumentedGame, SearchStats, instrument_agent
+
+# Nodes a worker takes from the shared node budget at a time
+NODE_LEASE = 64
+
+# Worker process state, set up by _init_worker
+_shared_alpha = None
+_shared_stop = None
+_shared_nodes = None
+_node_limit = None  # node_limit of the task being searched
+_agents = {}
+_position = (None, None)
+
+
+class _SharedStop:
+    """Lets a worker agent's stop_event check read the pool's shared stop flag"""
+
+    def is_set(self):
+        return _shared_stop.value != 0
+
+
+def encode_position(game):
+    """Returns (hex_size, bytes, rules) with the move history as 16-bit line indices"""
+    line_index = game.geometry.line_index
+    moves = array.array('H', [line_index[line] for line in game.get_move_history()]).tobytes()
+    return game.hex_size, moves, getattr(game, 'rules', None)
+
+
+def decode_position(encoding):
+    hex_size, moves, rules = encoding
+    game = BitboardHexGame(hex_size, rules)
+    lines = game.geometry.lines
+    for index in array.array('H', moves):
+        game.make_move(*lines[index])
+    return game
+
+
+def _init_worker(shared_alpha, shared_stop, shared_nodes):
+    global _shared_alpha, _shared_stop, _shared_nodes
+    _shared_alpha = shared_alpha
+    _shared_stop = shared_stop
+    _shared_nodes = shared_nodes
+
+
+def _lease_nodes(agent):
+    """Extends the agent's node_limit from the shared budget; False once it is spent"""
+    with _shared_nodes.get_lock():
+        grant = min(NODE_LEASE, _node_limit - _shared_nodes.value)
+        if grant <= 0:
+            return False
+        _shared_nodes.value += grant
+    agent.node_limit += grant
+    return True
+
+
+def _return_lease(agent):
+    """Gives back the leased nodes the agent did not search"""
+    unused = agent.node_limit - agent.nodes
+    if unused > 0:
+        with _shared_nodes.get_lock():
+            _shared_nodes.value -= unused
+
+
+def _check_shared_budget(agent, check):
+    """Worker agents' _check_budget: leases more nodes before the agent's own check runs out"""
+    if _node_limit is not None and agent.nodes >= agent.node_limit and not _lease_nodes(agent):
+        _shared_stop.value = 1  # The budget is spent for every worker
+    check()
+
+
+def _search_move(task):
+    """
+    Searches one root move to depth - 1 plies below it. Runs in a worker process.
+    Returns (score, pv as line indices, nodes, hit_horizon, stats), with score None
+    if the budget ran out first. stats is the task's SearchStats when instrumented.
+    """
+    global _position, _node_limit
+    config, encoding, move_index, depth, share_bounds, deadline, node_limit, fresh, instrument = task
+    from minimax_agent import WIN_SCORE, MinimaxAgent, SearchTimeout
+
+    if _shared_stop.value or (deadline is not None and time.perf_counter() >= deadline):
+        return None, [], 0, True, None  # Queued behind tasks that used up the budget
+
+    agent = _agents.get(config)
+    if agent is None:
+        search, tt_size_bits, symmetry, evaluation, quiescence = config
+        agent = MinimaxAgent(0, max_depth=None, search=search, node_limit=1, tt_size_bits=tt_size_bits,
+                             symmetry=symmetry, evaluation=evaluation, quiescence=quiescence)
+        agent._check_budget = functools.partial(_check_shared_budget, agent, agent._check_budget)
+        _agents[config] = agent
+    if fresh:
+        # Seeded searches give every task the same starting state, so results don't
+        # depend on which worker ran what before
+        agent._killers = {}
+        agent._history = {}
+        if agent.transposition_table is not None:
+            agent.transposition_table.clear()
+
+    if _position[0] != encoding:
+        _position = (encoding, decode_position(encoding))
+    game = _position[1]
+
+    agent.nodes = 0
+    _node_limit = node_limit
+    agent.node_limit = None if node_limit is None else 0  # Nodes are leased as the search goes
+    agent._deadline = deadline
+    agent._stop_event = _SharedStop()
+    agent._pv = []
+    agent._hit_horizon = False
+
+    # Scores above alpha are exact. Searching against one below the best score so
+    # far keeps a move that ties it exact too, so ties merge the same way however
+    # the workers were scheduled.
+    alpha = _shared_alpha.value - 1 if share_bounds else -WIN_SCORE - 1
+    beta = WIN_SCORE + 1
+    line = game.geometry.lines[move_index]
+    stats = remove = None
+    if instrument:
+        stats = SearchStats()
+        remove = instrument_agent(agent, stats)
+        tt = agent.transposition_table
+        probes, hits = (tt.probes, tt.hits) if tt is not None else (0, 0)
+    game.push_move(*line)
+    try:
+        score, pv = agent._negamax(game if stats is None else InstrumentedGame(game, stats),
+                                   depth - 1, -beta, -alpha, 1)
+    except SearchTimeout:
+        return None, [], agent.nodes, True, stats
+    finally:
+        game.pop_move()
+        if node_limit is not None:
+            _return_lease(agent)
+        if remove is not None:
+            remove()
+            if tt is not None:
+                stats.tt_probes = tt.probes - probes
+                stats.tt_hits = tt.hits - hits
+    score = -score
+
+    if share_bounds:
+        with _shared_alpha.get_lock():
+            if score > _shared_alpha.value:
+                _shared_alpha.value = score
+    line_index = game.geometry.line_index
+    return score, [move_index] + [line_index[move] for move in pv], agent.nodes, agent._hit_horizon, stats
+
+
+class RootParallelSearch:
+    """Persistent worker pool that searches the root moves of one MinimaxAgent"""
+
+    def __init__(self, workers):
+        self.workers = workers
+        self._alpha = multiprocessing.Value('l', 0)
+        self._stop = multiprocessing.Value('b', 0)
+        self._nodes = multiprocessing.Value('q', 0)  # Nodes searched or leased so far this move
+        self._pool = multiprocessing.Pool(workers, initializer=_init_worker,
+                                          initargs=(self._alpha, self._stop, self._nodes))
+
+    def close(self):
+        self._pool.terminate()
+        self._pool.join()
+
+    def search_root(self, agent, game, root_moves, depth):
+        """
+        Same contract as MinimaxAgent._search_root: returns (score, pv) and raises
+        SearchTimeout if the depth could not be finished.
+        """
+        from minimax_agent import WIN_SCORE, SearchTimeout
+
+        pruning = agent.search == 'alphabeta'
+        fresh = agent.seed is not None
+        # A transposition table can hand back results whose value depends on the search
+        # window, so seeded searches with one keep every root window the same
+        share_bounds = pruning and not (fresh and agent.transposition_table is not None)
+        config = (agent.search, agent.tt_size_bits, agent.symmetry, agent.evaluation, agent.quiescence)
+        # Workers count nodes, cutoffs and game operations themselves when the agent is instrumented
+        instrument = agent.stats is not None and agent.instrument and not agent._pondering
+        encoding = encode_position(game)
+        line_index = game.geometry.line_index
+        self._alpha.value = -WIN_SCORE - 1
+        self._stop.value = 0
+        self._nodes.value = agent.nodes
+
+        def submit(move):
+            # perf_counter reads a system-wide clock, so the deadline means the same in every process
+            task = (config, encoding, line_index[move], depth, share_bounds, agent._deadline, agent.node_limit,
+                    fresh, instrument)
+            return self._pool.apply_async(_search_move, (task,))
+
+        # Search the expected best move first, so the others start with a bound
+        first = submit(root_moves[0])
+        results = [self._collect(agent, first)]
+        pending = [submit(move) for move in root_moves[1:]]
+        results.extend(self._collect(agent, result) for result in pending)
+
+        best_score = -WIN_SCORE - 1
+        best_pv = None
+        timed_out = False
+        lines = game.geometry.lines
+        for score, pv, nodes, hit_horizon, stats in results:
+            agent.nodes += nodes
+            agent._hit_horizon |= hit_horizon
+            if stats is not None and instrument:
+                agent.stats.merge(stats)
+            if score is None:
+                timed_out = True
+            elif score > best_score:  # Ties go to the earlier root move
+                best_score = score
+                best_pv = [lines[index] for index in pv]
+        if timed_out:
+            raise SearchTimeout()
+        return best_score, best_pv
+
+    def _collect(self, agent, result):
+        """Waits for one task, passing the agent's stop_event on to the workers"""
+        while True:
+            try:
+                return result.get(timeout=0.05)
+            except multiprocessing.TimeoutError:
+                if agent._stop_event is not None and agent._stop_event.is_set():
+                    self._stop.value = 1
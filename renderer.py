@@ -1,16 +1,53 @@
+import argparse
 import pygame
 import math
+import threading
+import time
 from game import HexGame
 from minimax_agent import MinimaxAgent
 
+AI_TIME_LIMIT = 2.0  # Seconds per AI move on boards bigger than the standard size 3
+
+
+class SearchWorker:
+    """Runs one agent search on a copy of the game in a background thread"""
+
+    def __init__(self, agent, game, ponder=False):
+        self.agent = agent
+        self.pondering = ponder
+        self.history = game.get_move_history()  # Position the search belongs to
+        self.move = None
+        self.done = False
+        self.started = time.perf_counter()
+        self.stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(game.copy(),), daemon=True)
+        self._thread.start()
+
+    def _run(self, game):
+        if self.pondering:
+            self.agent.ponder(game, self.stop_event)
+        else:
+            self.move = self.agent.get_move(game, stop_event=self.stop_event)
+        self.done = True
+
+    def nodes_per_second(self):
+        elapsed = time.perf_counter() - self.started
+        return self.agent.nodes / elapsed if elapsed > 0 else 0.0
+
+    def cancel(self):
+        """Stops the search and waits for the thread, so the agent is free for the next one"""
+        self.stop_event.set()
+        self._thread.join()
+
+
 class HexRenderer:
-    def __init__(self):
+    def __init__(self, hex_size=3):
         pygame.init()
         
         # Constants
         self.WINDOW_WIDTH = 800
         self.WINDOW_HEIGHT = 600
-        self.HEX_SIZE = 40  # Distance from center to corner
+        self.HEX_SIZE = min(40, 380 // (3 * hex_size - 3))  # Distance from center to corner, shrunk to fit big boards
         
         # Colors
         self.BLACK = (0, 0, 0)
@@ -23,14 +60,30 @@ class HexRenderer:
         pygame.display.set_caption("Hex Game")
         
         # Game state
-        self.game = HexGame()
+        self.game = HexGame(hex_size)
         self.selected_points = []
         
         # AI setup
         self.player_vs_ai = False
         self.ai_vs_ai = False
-        self.ai_agent_1 = MinimaxAgent(player_number=1)  # AI plays as player 1
-        self.ai_agent_2 = MinimaxAgent(player_number=2)  # AI plays as player 2
+        self.pondering = False  # Let the AI think on the human's turn
+        self.show_stats = False  # Overlay the search speed of the running AI move
+        # Alpha-beta with a transposition table picks the same-valued moves as plain
+        # minimax, and the table is what lets pondering carry over to the AI's turn. Beyond
+        # size 3 a full depth 2 search takes too long, so moves get a time budget instead
+        time_limit = None if hex_size <= 3 else AI_TIME_LIMIT
+        self.ai_agent_1 = MinimaxAgent(player_number=1, search='alphabeta', tt_size_bits=18, time_limit=time_limit)  # AI plays as player 1
+        self.ai_agent_2 = MinimaxAgent(player_number=2, search='alphabeta', tt_size_bits=18, time_limit=time_limit)  # AI plays as player 2
+        self.search_worker = None  # Background search, so the window keeps responding
+        self.clock = pygame.time.Clock()
+
+        # Rendering caches: fonts, text surfaces, point positions and the board drawn so far
+        self.FPS = 30  # Frame cap; frames are only drawn when something changed
+        self.font = pygame.font.Font(None, 36)
+        self.small_font = pygame.font.Font(None, 24)
+        self._text_cache = {}
+        self.point_centers = {coord: tuple(int(v) for v in self.get_hex_center(*coord)) for coord in self.game.valid_points}
+        self._build_board_surface()
         
     def get_hex_center(self, row, col):
         """Calculate the center position of each hexagon"""
@@ -39,91 +92,140 @@ class HexRenderer:
         return (x + 200, y + 200)  # Offset from screen edge
         
     def get_nearest_hex_point(self, mouse_pos):
-        """Find the nearest valid hex point to the mouse position"""
+        """
+        Find the nearest valid hex point to the mouse position. Inverting
+        get_hex_center gives fractional (row, col); the nearest grid point is a
+        corner of the cell around it, so only those four are checked.
+        """
+        col = (mouse_pos[0] - 200) / (self.HEX_SIZE * 1.5)
+        row = (mouse_pos[1] - 200 - self.HEX_SIZE * math.sqrt(3) / 2) / (self.HEX_SIZE * math.sqrt(3)) + col / 2
+        row, col = math.floor(row), math.floor(col)
         min_dist = float('inf')
         nearest_coord = None
-        
-        for coord in self.game.valid_points:
-            center = self.get_hex_center(*coord)
+
+        for coord in ((row, col), (row + 1, col), (row, col + 1), (row + 1, col + 1)):
+            center = self.point_centers.get(coord)
+            if center is None:
+                continue
             dist = math.sqrt((mouse_pos[0] - center[0])**2 + (mouse_pos[1] - center[1])**2)
             if dist < min_dist:
                 min_dist = dist
                 nearest_coord = coord
-        
+
         return nearest_coord if min_dist < self.HEX_SIZE else None
     
     def get_triangle_center(self, triangle_points):
         """Calculate the center point of a triangle"""
-        centers = [self.get_hex_center(*p) for p in triangle_points]
+        centers = [self.point_centers[p] for p in triangle_points]
         x = sum(c[0] for c in centers) / 3
         y = sum(c[1] for c in centers) / 3
         return (int(x), int(y))
     
+    def _text(self, font, text, color):
+        """Returns a rendered text surface, rendering each distinct string only once"""
+        key = (id(font), text, color)
+        surface = self._text_cache.get(key)
+        if surface is None:
+            surface = font.render(text, True, color)
+            self._text_cache[key] = surface
+        return surface
+
+    def _build_board_surface(self):
+        """Draws the static grid once; lines and triangles are added to a copy as they appear"""
+        self.static_board = pygame.Surface((self.WINDOW_WIDTH, self.WINDOW_HEIGHT))
+        self.static_board.fill(self.BLACK)
+        for center in self.point_centers.values():
+            pygame.draw.circle(self.static_board, self.WHITE, center, 3)
+        self._reset_board_surface()
+
+    def _reset_board_surface(self):
+        self.board_surface = self.static_board.copy()
+        self._rendered_moves = []
+        self._rendered_triangles = set()
+
+    def _update_board_surface(self):
+        """Draws only the lines and triangle markers added since the last frame"""
+        history = self.game.get_move_history()
+        if history[:len(self._rendered_moves)] != self._rendered_moves:
+            self._reset_board_surface()  # Reset or undo; redraw from scratch
+        line_owners = self.game.line_owners
+        for start, end in history[len(self._rendered_moves):]:
+            color = self.PLAYER1_COLOR if line_owners[(start, end)] == 1 else self.PLAYER2_COLOR
+            pygame.draw.line(self.board_surface, color, self.point_centers[start], self.point_centers[end], 2)
+        self._rendered_moves = history
+
+        triangle_owners = self.game.triangle_owners
+        if len(triangle_owners) != len(self._rendered_triangles):
+            for triangle, player in triangle_owners.items():
+                if triangle not in self._rendered_triangles:
+                    color = self.PLAYER1_COLOR if player == 1 else self.PLAYER2_COLOR
+                    pygame.draw.circle(self.board_surface, color, self.get_triangle_center(triangle), 4)
+                    self._rendered_triangles.add(triangle)
+
+    def _frame_key(self):
+        """Everything that changes what is on screen; the window is redrawn only when it changes"""
+        worker = self.search_worker
+        thinking = None
+        if worker is not None and not worker.done:
+            thinking = (worker.pondering, worker.agent.current_best)
+            if self.show_stats:
+                # Refresh the speed overlay a few times a second rather than every frame
+                thinking += (int((time.perf_counter() - worker.started) * 4),)
+        return (len(self.game.line_owners), self.game.current_player, self.game.game_over,
+                tuple(self.selected_points), self.player_vs_ai, self.ai_vs_ai, self.pondering,
+                self.show_stats, thinking)
+
     def draw(self):
         """Draw the game state"""
-        self.screen.fill(self.BLACK)
-        
-        # Draw grid points
-        for coord in self.game.valid_points:
-            center = self.get_hex_center(*coord)
-            pygame.draw.circle(self.screen, self.WHITE, (int(center[0]), int(center[1])), 3)
-            
-            # Draw coordinates
-            '''
-            coord_text = f"{coord[0]},{coord[1]}"
-            font = pygame.font.Font(None, 20)
-            text_surface = font.render(coord_text, True, self.WHITE)
-            text_rect = text_surface.get_rect(center=(center[0], center[1] + 15))
-            self.screen.blit(text_surface, text_rect)
-            '''
-        
-        # Draw lines with player colors
-        state = self.game.get_state()
-        for (start, end), player in state['line_owners'].items():
-            color = self.PLAYER1_COLOR if player == 1 else self.PLAYER2_COLOR
-            pygame.draw.line(self.screen, color, 
-                           self.get_hex_center(*start), 
-                           self.get_hex_center(*end), 2)
-        
-        # Draw triangles
-        for triangle, player in state['triangle_owners'].items():
-            center = self.get_triangle_center(triangle)
-            color = self.PLAYER1_COLOR if player == 1 else self.PLAYER2_COLOR
-            pygame.draw.circle(self.screen, color, center, 4)
-        
+        self._update_board_surface()
+        self.screen.blit(self.board_surface, (0, 0))
+
+        # Draw the AI's current best move while it is thinking
+        worker = self.search_worker
+        thinking = worker is not None and not worker.done
+        if thinking:
+            best_move = worker.agent.current_best
+            if best_move and not worker.pondering:
+                pygame.draw.line(self.screen, (255, 255, 0),
+                                 self.point_centers[best_move[0]],
+                                 self.point_centers[best_move[1]], 1)
+
         # Draw selected point
         if self.selected_points:
-            center = self.get_hex_center(*self.selected_points[0])
-            pygame.draw.circle(self.screen, (255, 255, 0), (int(center[0]), int(center[1])), 5)
-        
+            pygame.draw.circle(self.screen, (255, 255, 0), self.point_centers[self.selected_points[0]], 5)
+
         # Draw current player indicator
-        font = pygame.font.Font(None, 36)
-        text = f"Player {state['current_player']}'s turn"
-        color = self.PLAYER1_COLOR if state['current_player'] == 1 else self.PLAYER2_COLOR
-        text_surface = font.render(text, True, color)
-        self.screen.blit(text_surface, (10, 10))
-        
+        color = self.PLAYER1_COLOR if self.game.current_player == 1 else self.PLAYER2_COLOR
+        self.screen.blit(self._text(self.font, f"Player {self.game.current_player}'s turn", color), (10, 10))
+
         # Draw scores
         scores = self.game.get_scores()
-        score_text = f"Blue: {scores[1]}  Red: {scores[2]}"
-        score_surface = font.render(score_text, True, self.WHITE)
-        self.screen.blit(score_surface, (10, 50))
+        self.screen.blit(self._text(self.font, f"Blue: {scores[1]}  Red: {scores[2]}", self.WHITE), (10, 50))
+
+        if thinking:
+            thinking_text = "AI pondering..." if worker.pondering else "AI thinking..."
+            self.screen.blit(self._text(self.small_font, thinking_text, (255, 255, 0)), (10, 130))
+            if self.show_stats:
+                stats_text = f"{worker.agent.nodes} nodes, {worker.nodes_per_second():,.0f} nodes/s"
+                self.screen.blit(self.small_font.render(stats_text, True, (255, 255, 0)), (10, 155))
 
         player_vs_ai_status  = "ON" if self.player_vs_ai else "OFF"
         ai_vs_ai_status = "ON" if self.ai_vs_ai else "OFF"
+        pondering_status = "ON" if self.pondering else "OFF"
+        stats_status = "ON" if self.show_stats else "OFF"
 
         # Add instructions for AI toggle and reset
-        small_font = pygame.font.Font(None, 24)  # Smaller font size
         instructions = [
             f"Press 'A' to toggle AI ({player_vs_ai_status})",
             f"Press 'V' to toggle AI vs AI ({ai_vs_ai_status})",
+            f"Press 'P' to toggle pondering ({pondering_status})",
+            f"Press 'N' to toggle search stats ({stats_status})",
             "Press 'R' to reset game"
         ]
-        
+
         y_offset = 10  # Starting y position
         for line in instructions:
-            instructions_surface = small_font.render(line, True, self.WHITE)
-            self.screen.blit(instructions_surface, (self.WINDOW_WIDTH - 250, y_offset))
+            self.screen.blit(self._text(self.small_font, line, self.WHITE), (self.WINDOW_WIDTH - 250, y_offset))
             y_offset += 25  # Space between lines
 
         # Game over text (existing code)
@@ -132,54 +234,88 @@ class HexRenderer:
                 text = f"Game over! Draw"
             else:
                 text = f"Game over! Winner: Player {self.game.winner}"
-            text_surface = font.render(text, True, self.WHITE)
-            self.screen.blit(text_surface, (10, 90))
-        
+            self.screen.blit(self._text(self.font, text, self.WHITE), (10, 90))
+
         pygame.display.flip()
-    
+
+    def ai_agent_to_move(self):
+        """Returns the agent whose turn it is, or None on a human's turn"""
+        if self.game.game_over:
+            return None
+        if self.ai_vs_ai:
+            return self.ai_agent_1 if self.game.current_player == self.ai_agent_1.player_number else self.ai_agent_2
+        if self.player_vs_ai and self.game.current_player == self.ai_agent_2.player_number:
+            return self.ai_agent_2
+        return None
+
+    def update_ai(self):
+        """Starts, collects or cancels background searches to match the current turn"""
+        agent = self.ai_agent_to_move()
+        worker = self.search_worker
+        history = self.game.get_move_history()
+
+        if agent is not None:
+            if worker is not None and (worker.agent is not agent or worker.pondering or worker.history != history):
+                self.stop_search()
+                worker = None
+            if worker is None:
+                self.search_worker = SearchWorker(agent, self.game)
+            elif worker.done:
+                self.search_worker = None
+                if worker.move:
+                    point1, point2 = worker.move
+                    self.game.make_move(point1, point2)
+        elif self.pondering and self.player_vs_ai and not self.game.game_over:
+            # Think about the position the human is looking at
+            if worker is not None and (not worker.pondering or worker.history != history):
+                self.stop_search()
+                worker = None
+            if worker is None:
+                self.search_worker = SearchWorker(self.ai_agent_2, self.game, ponder=True)
+        elif worker is not None:
+            self.stop_search()
+
+    def stop_search(self):
+        if self.search_worker is not None:
+            self.search_worker.cancel()
+            self.search_worker = None
+
     def run(self):
         """Main game loop"""
         running = True
         self.draw()
+        drawn_key = self._frame_key()
         while running:
-            # If it's AI's turn, make AI move
-            if self.player_vs_ai:
-                if self.game.current_player == self.ai_agent_2.player_number and not self.game.game_over:
-                    best_move = self.ai_agent_2.get_move(self.game)
-
-                    if best_move:
-                        point1, point2 = best_move
-                        self.game.make_move(point1, point2)
-            elif self.ai_vs_ai:
-                if self.game.current_player == self.ai_agent_1.player_number and not self.game.game_over:
-                    best_move = self.ai_agent_1.get_move(self.game)
-                    if best_move:
-                        point1, point2 = best_move
-                        self.game.make_move(point1, point2)
-
-                if self.game.current_player == self.ai_agent_2.player_number and not self.game.game_over:
-                    best_move = self.ai_agent_2.get_move(self.game)
-                    if best_move:
-                        point1, point2 = best_move
-                        self.game.make_move(point1, point2)
+            # AI searches run in the background; this only starts them and plays finished moves
+            self.update_ai()
 
             for event in pygame.event.get():
                 if event.type == pygame.QUIT:
                     running = False
+                elif event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED):
+                    drawn_key = None  # Window contents were lost, redraw
                 elif event.type == pygame.KEYDOWN:
                     if event.key == pygame.K_ESCAPE:
                         running = False
                     elif event.key == pygame.K_r:  # Reset game
+                        self.stop_search()
                         self.game.reset()
                         self.selected_points = []
                     elif event.key == pygame.K_a:  # Toggle AI
+                        self.stop_search()
                         self.player_vs_ai = not self.player_vs_ai
                     elif event.key == pygame.K_v:
+                        self.stop_search()
                         self.ai_vs_ai = not self.ai_vs_ai
+                    elif event.key == pygame.K_p:  # Toggle pondering
+                        self.stop_search()
+                        self.pondering = not self.pondering
+                    elif event.key == pygame.K_n:  # Toggle search stats overlay
+                        self.show_stats = not self.show_stats
                 elif event.type == pygame.MOUSEBUTTONDOWN:
                     if event.button == 1:  # Left click
                         # Only process clicks if it's human's turn
-                        if not self.player_vs_ai or not self.ai_vs_ai or self.game.current_player != self.ai_agent_1.player_number and not self.game.game_over:
+                        if self.ai_agent_to_move() is None and not self.game.game_over:
                             coord = self.get_nearest_hex_point(pygame.mouse.get_pos())
                             if coord:
                                 if not self.selected_points:
@@ -189,11 +325,19 @@ class HexRenderer:
                                     self.selected_points = []
                     elif event.button == 3:  # Right click
                         self.selected_points = []
-            
-            self.draw()
-        
+
+            frame_key = self._frame_key()
+            if frame_key != drawn_key:
+                self.draw()
+                drawn_key = frame_key
+            self.clock.tick(self.FPS)  # Sleep between frames, leaving the CPU to the search
+
+        self.stop_search()
         pygame.quit()
 
 if __name__ == "__main__":
-    renderer = HexRenderer()
+    parser = argparse.ArgumentParser(description="Play Triggle in a window")
+    parser.add_argument('--hex-size', type=int, default=3, help="Board size, 2 to 8")
+    args = parser.parse_args()
+    renderer = HexRenderer(args.hex_size)
     renderer.run()
@@ -0,0 +1,89 @@
+"""
+Declarative board and rule variants.
+
+A Rules object describes a variant; get_geometry(rules.hex_size, rules) compiles
+it once into the same lookup tables the standard game uses, so variants play at
+the same per-move cost. Play one with BitboardHexGame(rules=rules):
+
+    Rules(hex_size=4, removed_points=[(3, 3)], line_lengths=[4], bent_lines=True)
+    Rules.from_dict({"hex_size": 3, "triangle_weights": [[[[2, 2], [3, 2], [3, 3]], 3]], "win_score": 10})
+"""
+
+
+def _point(value):
+    row, col = value
+    return (int(row), int(col))
+
+
+class Rules:
+    """
+    Board and rule variant:
+        hex_size          board size; also fixes the center that symmetries turn about
+        points            explicit point set for other grid shapes (default: the hexagon)
+        removed_points    points taken out of the grid
+        line_lengths      allowed straight line lengths in unit segments (default: any)
+        bent_lines        also allow two-segment lines that bend at their middle point,
+                          played as (end1, end2, corner)
+        triangle_weights  {triangle: points} for triangles worth other than 1
+        win_score         first to reach this score wins (default: more than half of
+                          all triangle points wins, exactly half each is a draw)
+    When no line can be drawn any more, the higher score wins.
+    """
+
+    __slots__ = ('hex_size', 'points', 'removed_points', 'line_lengths', 'bent_lines', 'triangle_weights',
+                 'win_score', '_key')
+
+    def __init__(self, hex_size=3, points=None, removed_points=(), line_lengths=None, bent_lines=False,
+                 triangle_weights=None, win_score=None):
+        self.hex_size = hex_size
+        self.points = None if points is None else tuple(sorted(set(_point(p) for p in points)))
+        self.removed_points = frozenset(_point(p) for p in removed_points)
+        self.line_lengths = None if line_lengths is None else frozenset(line_lengths)
+        self.bent_lines = bool(bent_lines)
+        weights = {}
+        for triangle, weight in (triangle_weights or {}).items():
+            if weight != 1:
+                weights[tuple(sorted(_point(p) for p in triangle))] = weight
+        self.triangle_weights = weights
+        self.win_score = win_score
+        self._key = (hex_size, self.points, self.removed_points, self.line_lengths, self.bent_lines,
+                     tuple(sorted(weights.items())), win_score)
+
+    def __eq__(self, other):
+        return isinstance(other, Rules) and self._key == other._key
+
+    def __hash__(self):
+        return hash(self._key)
+
+    def __repr__(self):
+        return f"Rules({self.to_dict()!r})"
+
+    def __reduce__(self):
+        return (Rules, (self.hex_size, self.points, self.removed_points, self.line_lengths, self.bent_lines,
+                        self.triangle_weights, self.win_score))
+
+    def to_dict(self):
+        """JSON-friendly form, the inverse of from_dict"""
+        spec = {'hex_size': self.hex_size}
+        if self.points is not None:
+            spec['points'] = [list(p) for p in self.points]
+        if self.removed_points:
+            spec['removed_points'] = [list(p) for p in sorted(self.removed_points)]
+        if self.line_lengths is not None:
+            spec['line_lengths'] = sorted(self.line_lengths)
+        if self.bent_lines:
+            spec['bent_lines'] = True
+        if self.triangle_weights:
+            spec['triangle_weights'] = [[[list(p) for p in triangle], weight]
+                                        for triangle, weight in sorted(self.triangle_weights.items())]
+        if self.win_score is not None:
+            spec['win_score'] = self.win_score
+        return spec
+
+    @classmethod
+    def from_dict(cls, spec):
+        spec = dict(spec)
+        if 'triangle_weights' in spec:
+            spec['triangle_weights'] = {tuple(_point(p) for p in triangle): weight
+                                        for triangle, weight in spec['triangle_weights']}
+        return cls(**spec)
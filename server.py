@@ -0,0 +1,273 @@
+"""
+Headless asyncio game server for online play.
+
+Clients talk newline-delimited JSON over TCP. One process hosts many games at
+once; AI moves are searched in a process pool so the event loop never waits on
+them, and only what changed is sent after each move.
+
+    python server.py --port 8765
+
+Client -> server
+    {"type": "join", "opponent": "human" | "ai", "hex_size": 3}
+    {"type": "move", "line": [[r1, c1], [r2, c2]]}
+    {"type": "stats"}
+
+Server -> client
+    {"type": "joined", "game": id, "player": 1 | 2, "hex_size": 3, "lines": [...], "waiting": bool}
+    {"type": "start", "game": id}
+    {"type": "move", "line": ..., "player": p, "triangles": [...], "scores": [s1, s2],
+     "next": p, "game_over": bool, "winner": w}
+    {"type": "opponent_left"} / {"type": "error", "message": ...} / {"type": "stats", ...}
+"""
+import argparse
+import asyncio
+import concurrent.futures
+import itertools
+import json
+import time
+
+from bitboard_game import BitboardHexGame
+from parallel_search import decode_position, encode_position
+from tournament import AGENT_TYPES, check_pool_spec, parse_agent_spec
+
+MAX_LINE_BYTES = 4096  # Longest request accepted; bounds each connection's read buffer
+MAX_WRITE_BUFFER = 1 << 16  # Clients that fall further behind than this are dropped
+DEFAULT_AI = 'minimax:max_depth=2,search=alphabeta'
+
+# Agents cached in each AI worker process, by (spec, player)
+_ai_agents = {}
+
+
+def ai_move(spec, player, encoding):
+    """Searches one position in an AI worker process and returns the line index"""
+    agent = _ai_agents.get((spec, player))
+    if agent is None:
+        name, kwargs = parse_agent_spec(spec)
+        agent = _ai_agents[(spec, player)] = AGENT_TYPES[name](player, **kwargs)
+    game = decode_position(encoding)
+    move = agent.get_move(game)
+    return game.geometry.line_index[move]
+
+
+class GameSession:
+    """One game and the connections playing it"""
+
+    __slots__ = ('id', 'game', 'players', 'ai_player', 'ai_spec', 'last_active')
+
+    def __init__(self, session_id, hex_size, ai_spec=None):
+        self.id = session_id
+        self.game = BitboardHexGame(hex_size)
+        self.players = {1: None, 2: None}  # Seat -> StreamWriter
+        self.ai_player = 2 if ai_spec else None
+        self.ai_spec = ai_spec
+        self.last_active = time.monotonic()
+
+    def open_seat(self):
+        for seat in (1, 2):
+            if self.players[seat] is None and seat != self.ai_player:
+                return seat
+        return None
+
+
+class GameServer:
+    """
+    Matches connections into games and relays moves. Memory stays bounded: at most
+    max_games sessions exist, games idle for idle_timeout seconds are closed, and
+    finished or abandoned games are dropped as soon as their players leave.
+    """
+
+    def __init__(self, max_games=10000, idle_timeout=300.0, ai_workers=None, ai_spec=DEFAULT_AI):
+        self.max_games = max_games
+        self.idle_timeout = idle_timeout
+        check_pool_spec(ai_spec)
+        self.ai_spec = ai_spec
+        self.sessions = {}
+        self.waiting = {}  # hex_size -> session with an open human seat
+        self.connections = 0
+        self.moves_played = 0
+        self._ids = itertools.count(1)
+        self._executor = concurrent.futures.ProcessPoolExecutor(ai_workers)
+
+    async def serve(self, host='127.0.0.1', port=8765):
+        server = await asyncio.start_server(self.handle_client, host, port, limit=MAX_LINE_BYTES)
+        reaper = asyncio.create_task(self._reap_idle())
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            reaper.cancel()
+            self._executor.shutdown(cancel_futures=True)
+
+    async def handle_client(self, reader, writer):
+        self.connections += 1
+        session = seat = None
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except (asyncio.LimitOverrunError, ValueError):
+                    self.send(writer, {'type': 'error', 'message': 'request too long'})
+                    break
+                if not line:
+                    break
+                try:
+                    message = json.loads(line)
+                    kind = message['type']
+                except (ValueError, KeyError, TypeError):
+                    self.send(writer, {'type': 'error', 'message': 'malformed request'})
+                    continue
+
+                if kind == 'join' and session is None:
+                    session, seat = self.join(writer, message)
+                elif kind == 'move' and session is not None:
+                    self.play(session, seat, message.get('line'))
+                elif kind == 'stats':
+                    self.send(writer, self.stats())
+                else:
+                    self.send(writer, {'type': 'error', 'message': f'unexpected {kind!r}'})
+        except ConnectionError:
+            pass
+        finally:
+            self.connections -= 1
+            if session is not None:
+                self.leave(session, seat)
+            writer.close()
+
+    def join(self, writer, message):
+        hex_size = message.get('hex_size', 3)
+        if not isinstance(hex_size, int) or not 2 <= hex_size <= 8:
+            self.send(writer, {'type': 'error', 'message': 'hex_size must be 2 to 8'})
+            return None, None
+        vs_ai = message.get('opponent') == 'ai'
+
+        session = None if vs_ai else self.waiting.pop(hex_size, None)
+        if session is None:
+            if len(self.sessions) >= self.max_games:
+                self.send(writer, {'type': 'error', 'message': 'server full'})
+                return None, None
+            session = GameSession(next(self._ids), hex_size, self.ai_spec if vs_ai else None)
+            self.sessions[session.id] = session
+            if not vs_ai:
+                self.waiting[hex_size] = session
+        seat = session.open_seat()
+        session.players[seat] = writer
+        session.last_active = time.monotonic()
+
+        waiting = not vs_ai and session.players[3 - seat] is None
+        self.send(writer, {'type': 'joined', 'game': session.id, 'player': seat, 'hex_size': hex_size,
+                           'lines': session.game.get_move_history(), 'waiting': waiting})
+        if not waiting:
+            self.broadcast(session, {'type': 'start', 'game': session.id})
+        return session, seat
+
+    def play(self, session, seat, line):
+        game = session.game
+        if game.game_over or game.current_player != seat or self._opponent_missing(session):
+            self.send(session.players[seat], {'type': 'error', 'message': 'not your turn'})
+            return
+        try:
+            (r1, c1), (r2, c2) = line
+            point1, point2 = (int(r1), int(c1)), (int(r2), int(c2))
+        except (TypeError, ValueError):
+            self.send(session.players[seat], {'type': 'error', 'message': 'line must be [[r, c], [r, c]]'})
+            return
+        if not self.apply(session, point1, point2):
+            self.send(session.players[seat], {'type': 'error', 'message': 'invalid move'})
+            return
+        if session.ai_player is not None and not game.game_over:
+            asyncio.create_task(self._ai_turn(session))
+
+    def apply(self, session, point1, point2):
+        """Plays a move and sends both players what changed; returns whether it was valid"""
+        game = session.game
+        player = game.current_player
+        result = game.make_move(point1, point2)
+        if not result['valid']:
+            return False
+        self.moves_played += 1
+        session.last_active = time.monotonic()
+        scores = game.get_scores()
+        self.broadcast(session, {
+            'type': 'move',
+            'line': game.moves[-1][0],
+            'player': player,
+            'triangles': sorted(result['triangles_formed']),
+            'scores': [scores[1], scores[2]],
+            'next': game.current_player,
+            'game_over': game.game_over,
+            'winner': game.winner
+        })
+        return True
+
+    async def _ai_turn(self, session):
+        game = session.game
+        moves_before = len(game.moves)
+        loop = asyncio.get_running_loop()
+        try:
+            index = await loop.run_in_executor(self._executor, ai_move, session.ai_spec, session.ai_player,
+                                               encode_position(game))
+        except (concurrent.futures.process.BrokenProcessPool, RuntimeError):
+            return  # Shutting down
+        if self.sessions.get(session.id) is session and len(game.moves) == moves_before:
+            self.apply(session, *game.geometry.lines[index])
+
+    def leave(self, session, seat):
+        session.players[seat] = None
+        if self.waiting.get(session.game.hex_size) is session:
+            del self.waiting[session.game.hex_size]
+        if any(session.players.values()):
+            self.broadcast(session, {'type': 'opponent_left'})
+        self.sessions.pop(session.id, None)  # A game can't continue with a seat empty
+
+    def _opponent_missing(self, session):
+        return any(writer is None for seat, writer in session.players.items() if seat != session.ai_player)
+
+    def broadcast(self, session, message):
+        for writer in session.players.values():
+            if writer is not None:
+                self.send(writer, message)
+
+    def send(self, writer, message):
+        if writer.is_closing():
+            return
+        if writer.transport.get_write_buffer_size() > MAX_WRITE_BUFFER:
+            writer.close()  # Not reading its messages; don't buffer without limit
+            return
+        writer.write(json.dumps(message, separators=(',', ':')).encode() + b'\n')
+
+    def stats(self):
+        return {'type': 'stats', 'games': len(self.sessions), 'connections': self.connections,
+                'waiting': len(self.waiting), 'moves_played': self.moves_played}
+
+    async def _reap_idle(self):
+        while True:
+            await asyncio.sleep(min(30.0, self.idle_timeout))
+            cutoff = time.monotonic() - self.idle_timeout
+            for session in [s for s in self.sessions.values() if s.last_active < cutoff]:
+                for writer in session.players.values():
+                    if writer is not None:
+                        writer.close()  # handle_client's cleanup removes the session
+                self.sessions.pop(session.id, None)
+                if self.waiting.get(session.game.hex_size) is session:
+                    del self.waiting[session.game.hex_size]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Host many online games in one process")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--max-games', type=int, default=10000)
+    parser.add_argument('--idle-timeout', type=float, default=300.0, help="Seconds before an idle game is closed")
+    parser.add_argument('--ai', default=DEFAULT_AI, help="Agent spec for AI opponents, as in tournament.py")
+    parser.add_argument('--ai-workers', type=int, default=None, help="AI worker processes (defaults to all cores)")
+    args = parser.parse_args()
+
+    server = GameServer(args.max_games, args.idle_timeout, args.ai_workers, args.ai)
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
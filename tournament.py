@@ -0,0 +1,269 @@
+"""
+Headless AI vs AI tournaments.
+
+Plays many games across a process pool, streams one JSON line per game to disk
+and reports win rates by seat with 95% confidence intervals. Each game gets its
+own seed, so any single game can be replayed exactly, and an interrupted run
+picks up where it stopped when started again with the same output file.
+With --records, the moves of every game are also appended to a binary game
+record file (see game_record.py) for training.
+
+    python tournament.py --games 2000 --agent1 minimax:max_depth=2 --output results.jsonl
+"""
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import statistics
+import time
+
+from bitboard_game import BitboardHexGame
+from game_record import GameRecordWriter, encode_moves
+from mcts_agent import MCTSAgent
+from minimax_agent import MinimaxAgent
+
+AGENT_TYPES = {
+    'minimax': MinimaxAgent,
+    'mcts': MCTSAgent
+}
+
+
+def parse_agent_spec(spec):
+    """
+    Parses 'name:key=value,key=value' into (name, kwargs), e.g.
+    'minimax:max_depth=3,search=alphabeta' or 'mcts:time_limit=0.1'. In a tournament
+    a seed option is mixed into each game's seed instead of fixing one for all games.
+    """
+    name, _, options = spec.partition(':')
+    if name not in AGENT_TYPES:
+        raise ValueError(f"Unknown agent {name!r}, expected one of {sorted(AGENT_TYPES)}")
+    kwargs = {}
+    for option in filter(None, options.split(',')):
+        key, _, value = option.partition('=')
+        kwargs[key] = _parse_value(value)
+    return name, kwargs
+
+
+def check_pool_spec(spec):
+    """
+    Rejects specs that cannot run inside a worker process of a pool: the agent's own
+    workers would need a nested pool, and pool workers may not start processes.
+    """
+    name, kwargs = parse_agent_spec(spec)
+    if (kwargs.get('workers') or 0) > 1:
+        raise ValueError(f"{spec!r}: agents here already run in worker processes and cannot start "
+                         f"their own pool; drop workers= and use more worker processes instead")
+    return name, kwargs
+
+
+def format_agent_spec(name, kwargs):
+    """Inverse of parse_agent_spec"""
+    options = ','.join(f"{key}={value}" for key, value in sorted(kwargs.items()))
+    return f"{name}:{options}" if options else name
+
+
+def _parse_value(value):
+    if value in ('None', 'none'):
+        return None
+    if value in ('True', 'true'):
+        return True
+    if value in ('False', 'false'):
+        return False
+    for convert in (int, float):
+        try:
+            return convert(value)
+        except ValueError:
+            pass
+    return value
+
+
+def game_seed(base_seed, index):
+    """Seed for one game, independent of which worker plays it or in what order"""
+    return base_seed * 1_000_003 + index
+
+
+def play_game(task):
+    """Plays one game; runs in a worker process. Returns the record to store."""
+    index, seed, hex_size, specs = task
+    game = BitboardHexGame(hex_size)
+    agents = {}
+    for seat, (name, kwargs) in specs.items():
+        kwargs = dict(kwargs)
+        agent_seed = seed * 2 + seat
+        spec_seed = kwargs.pop('seed', None)
+        if spec_seed is not None:
+            # A seed in the spec picks another set of games, still one per game seed
+            agent_seed = agent_seed * 1_000_003 + spec_seed
+        agents[seat] = AGENT_TYPES[name](seat, seed=agent_seed, **kwargs)
+
+    move_times = {1: [], 2: []}
+    try:
+        while not game.game_over:
+            seat = game.current_player
+            start = time.perf_counter()
+            move = agents[seat].get_move(game)
+            move_times[seat].append(time.perf_counter() - start)
+            if move is None or not game.make_move(*move)['valid']:
+                raise RuntimeError(f"Agent in seat {seat} returned invalid move {move!r} in game {index}")
+    finally:
+        for agent in agents.values():
+            if hasattr(agent, 'close'):
+                agent.close()
+
+    scores = game.get_scores()
+    return {
+        'game': index,
+        'seed': seed,
+        'winner': game.winner,
+        'moves': len(game.moves),
+        'lines': encode_moves(game).tolist(),
+        'scores': [scores[1], scores[2]],
+        'agents': {seat: format_agent_spec(name, kwargs) for seat, (name, kwargs) in specs.items()},
+        'move_time': {seat: sum(times) / len(times) if times else 0.0 for seat, times in move_times.items()}
+    }
+
+
+def wilson_interval(successes, trials, z=1.96):
+    """95% Wilson score interval for a binomial proportion"""
+    if trials == 0:
+        return 0.0, 0.0
+    p = successes / trials
+    denominator = 1 + z * z / trials
+    center = (p + z * z / (2 * trials)) / denominator
+    margin = z * math.sqrt(p * (1 - p) / trials + z * z / (4 * trials * trials)) / denominator
+    return center - margin, center + margin
+
+
+def summarize(records):
+    """Returns win rates by seat and by agent, game lengths and time per move"""
+    games = len(records)
+    summary = {'games': games}
+    for label, winner in (('player1', 1), ('player2', 2), ('draw', 0)):
+        count = sum(1 for record in records if record['winner'] == winner)
+        low, high = wilson_interval(count, games)
+        summary[label] = {'count': count, 'rate': count / games if games else 0.0, 'ci95': [low, high]}
+
+    by_agent = {}
+    for record in records:
+        for seat in ('1', '2'):
+            stats = by_agent.setdefault(record['agents'][seat], {'games': 0, 'wins': 0, 'move_times': []})
+            stats['games'] += 1
+            stats['wins'] += record['winner'] == int(seat)
+            stats['move_times'].append(record['move_time'][seat])
+    summary['agents'] = {
+        agent: {
+            'games': stats['games'],
+            'win_rate': stats['wins'] / stats['games'],
+            'ci95': list(wilson_interval(stats['wins'], stats['games'])),
+            'mean_move_time': statistics.fmean(stats['move_times'])
+        }
+        for agent, stats in by_agent.items()
+    }
+
+    lengths = [record['moves'] for record in records]
+    if lengths:
+        summary['game_length'] = {
+            'mean': statistics.fmean(lengths),
+            'median': statistics.median(lengths),
+            'min': min(lengths),
+            'max': max(lengths)
+        }
+    return summary
+
+
+def load_results(path, config):
+    """
+    Reads a previous run's records so it can be resumed. The file is rewritten
+    without any line left half-written by an interruption.
+    """
+    records = []
+    if not os.path.exists(path):
+        return records
+    with open(path) as f:
+        lines = f.readlines()
+    if not lines:
+        return records
+    try:
+        stored_config = json.loads(lines[0])
+    except json.JSONDecodeError:
+        stored_config = None
+    if stored_config != config:
+        raise ValueError(f"{path} was written with different settings; use a new --output to start over")
+    for line in lines[1:]:
+        try:
+            records.append(json.loads(line))
+        except json.JSONDecodeError:
+            break
+    with open(path, 'w') as f:
+        f.write(json.dumps(config) + '\n')
+        for record in records:
+            f.write(json.dumps(record) + '\n')
+    return records
+
+
+def run_tournament(games, agent1, agent2, output, hex_size=3, seed=0, workers=None, swap_seats=False,
+                   records_path=None):
+    """
+    Plays games between agent specs (see parse_agent_spec) and returns the summary.
+    With swap_seats, the agents change seats every other game. records_path
+    appends each newly played game to a binary game record file.
+    """
+    config = {'type': 'config', 'games': games, 'agent1': agent1, 'agent2': agent2,
+              'hex_size': hex_size, 'seed': seed, 'swap_seats': swap_seats}
+    records = load_results(output, config)
+    done = {record['game'] for record in records}
+
+    specs = {1: check_pool_spec(agent1), 2: check_pool_spec(agent2)}
+    tasks = []
+    for index in range(games):
+        if index in done:
+            continue
+        seats = {2: specs[1], 1: specs[2]} if swap_seats and index % 2 else specs
+        tasks.append((index, game_seed(seed, index), hex_size, seats))
+
+    if tasks:
+        new_file = not os.path.exists(output) or os.path.getsize(output) == 0
+        writer = None if records_path is None else GameRecordWriter(records_path, hex_size)
+        try:
+            with open(output, 'a') as f, multiprocessing.Pool(workers or os.cpu_count()) as pool:
+                if new_file:
+                    f.write(json.dumps(config) + '\n')
+                for record in pool.imap_unordered(play_game, tasks):
+                    # JSON object keys are strings; store them that way so resumed records match
+                    record = json.loads(json.dumps(record))
+                    records.append(record)
+                    # Record the moves before the result: a resumed run skips every game
+                    # with a result, so its moves must already be on disk
+                    if writer is not None:
+                        writer.write_moves(record['lines'], record['winner'])
+                        writer.flush()
+                    f.write(json.dumps(record) + '\n')
+                    f.flush()
+        finally:
+            if writer is not None:
+                writer.close()
+    return summarize(records)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Play headless AI vs AI games and report win rates by seat")
+    parser.add_argument('--games', type=int, default=1000)
+    parser.add_argument('--agent1', default='minimax', help="Agent spec for seat 1, e.g. minimax:max_depth=2")
+    parser.add_argument('--agent2', default=None, help="Agent spec for seat 2 (defaults to --agent1)")
+    parser.add_argument('--hex-size', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (defaults to all cores)")
+    parser.add_argument('--swap-seats', action='store_true', help="Alternate which agent plays first")
+    parser.add_argument('--output', default='tournament_results.jsonl')
+    parser.add_argument('--records', default=None, help="Also append game moves to this binary record file")
+    args = parser.parse_args()
+
+    summary = run_tournament(args.games, args.agent1, args.agent2 or args.agent1, args.output,
+                             hex_size=args.hex_size, seed=args.seed, workers=args.workers,
+                             swap_seats=args.swap_seats, records_path=args.records)
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
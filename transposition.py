@@ -0,0 +1,78 @@
+import sys
+
+# Bound types stored with each entry
+EXACT = 0
+LOWER = 1  # Search failed high, true score >= stored score
+UPPER = 2  # Search failed low, true score <= stored score
+
+
+class TranspositionTable:
+    """
+    Fixed-size table of search results keyed by 64-bit Zobrist hash.
+
+    Each slot holds one (key, depth, bound, score, move, generation) tuple. A new
+    result replaces the slot's entry when the slot is empty, holds the same
+    position, was written by an older search, or was searched less deeply.
+    """
+
+    def __init__(self, size_bits=18):
+        self.size = 1 << size_bits
+        self._index_mask = self.size - 1
+        self._slots = [None] * self.size
+        self.generation = 0
+        self.filled = 0
+
+        # Stats
+        self.probes = 0
+        self.hits = 0
+        self.stores = 0
+        self.replacements = 0
+        self.rejected = 0
+
+    def new_search(self):
+        """Marks existing entries as older, so a new search may overwrite them"""
+        self.generation += 1
+
+    def probe(self, key):
+        """Returns (depth, bound, score, move) stored for key, or None"""
+        self.probes += 1
+        entry = self._slots[key & self._index_mask]
+        if entry is not None and entry[0] == key:
+            self.hits += 1
+            return entry[1:5]
+        return None
+
+    def store(self, key, depth, bound, score, move):
+        index = key & self._index_mask
+        entry = self._slots[index]
+        if entry is None:
+            self.filled += 1
+        elif entry[0] != key and entry[5] == self.generation and entry[1] > depth:
+            self.rejected += 1
+            return
+        elif entry[0] != key:
+            self.replacements += 1
+        self.stores += 1
+        self._slots[index] = (key, depth, bound, score, move, self.generation)
+
+    def clear(self):
+        self._slots = [None] * self.size
+        self.filled = 0
+
+    def stats(self):
+        """Returns hit rate, occupancy and an estimate of memory use in bytes"""
+        memory = sys.getsizeof(self._slots)
+        for entry in self._slots:
+            if entry is not None:
+                memory += sys.getsizeof(entry) + sum(sys.getsizeof(value) for value in entry)
+        return {
+            'probes': self.probes,
+            'hits': self.hits,
+            'hit_rate': self.hits / self.probes if self.probes else 0.0,
+            'stores': self.stores,
+            'replacements': self.replacements,
+            'rejected': self.rejected,
+            'entries': self.filled,
+            'capacity': self.size,
+            'memory_bytes': memory
+        }